@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import count
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.app.config import config
+
+
+@dataclass
+class _CacheEntry:
+    vector: np.ndarray
+    answer: str
+    documents: List
+    created_at: float
+    scope: Optional[str]
+
+
+class SemanticCache:
+    """
+    Cache de réponses indexé par l'embedding de la question.
+
+    Une question dont l'embedding a une similarité cosinus >= `threshold` avec une
+    question déjà traitée réutilise la réponse et les documents associés.
+    Les entrées expirent après `ttl` secondes, le cache est borné à `max_size` entrées
+    (éviction LRU) et il est vidé à chaque modification du corpus (`invalidate`).
+    """
+
+    def __init__(
+        self,
+        threshold: float = config.SEMANTIC_CACHE.SIMILARITY_THRESHOLD,
+        ttl: float = config.SEMANTIC_CACHE.TTL,
+        max_size: int = config.SEMANTIC_CACHE.MAX_SIZE,
+        enabled: bool = config.SEMANTIC_CACHE.ENABLED,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.enabled = enabled
+        self.corpus_version = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._ids = count()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _purge_expired(self):
+        now = monotonic()
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry.created_at > self.ttl
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, vector, scope: Optional[str] = None) -> Optional[Tuple[str, List]]:
+        """
+        Retourne (réponse, documents) si une question assez proche est en cache.
+
+        Seules les entrées de même `scope` (modèle utilisé, ...) sont comparées.
+        """
+        if not self.enabled:
+            return None
+
+        query = self._normalize(vector)
+        with self._lock:
+            self._purge_expired()
+            keys = [key for key, entry in self._entries.items() if entry.scope == scope]
+            if not keys:
+                self._misses += 1
+                return None
+
+            matrix = np.stack([self._entries[key].vector for key in keys])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+
+            if similarities[best] < self.threshold:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(keys[best])
+            entry = self._entries[keys[best]]
+            return entry.answer, entry.documents
+
+    def store(
+        self,
+        vector,
+        answer: str,
+        documents: List,
+        corpus_version: int,
+        scope: Optional[str] = None,
+    ):
+        """
+        Ajoute une réponse au cache.
+
+        `corpus_version` est la version du corpus lue avant la recherche : si le corpus
+        a changé pendant la génération, la réponse est ignorée.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if corpus_version != self.corpus_version:
+                return
+
+            self._entries[next(self._ids)] = _CacheEntry(
+                vector=self._normalize(vector),
+                answer=answer,
+                documents=documents,
+                created_at=monotonic(),
+                scope=scope,
+            )
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Vide le cache après un ajout ou une suppression de documents."""
+        with self._lock:
+            self._entries.clear()
+            self.corpus_version += 1
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "corpus_version": self.corpus_version,
+        }
+
+
+semantic_cache = SemanticCache()
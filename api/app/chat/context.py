@@ -0,0 +1,92 @@
+from typing import Dict, List
+
+from llama_cpp import Llama
+
+from api.app.config import config
+
+# En dessous de cette longueur, un recouvrement est considéré comme une coïncidence
+MIN_OVERLAP = 20
+
+
+class ContextAssembler:
+    """
+    Construit le contexte envoyé au modèle à partir des chunks retrouvés.
+
+    - Les chunks adjacents d'un même fichier (`chunk_index` consécutifs) sont fusionnés
+      en supprimant le texte en recouvrement (jusqu'à `CHUNKS.OVERLAP` caractères).
+    - Les passages obtenus sont ajoutés par score décroissant tant que le budget de tokens
+      (compté avec le tokenizer du modèle chargé) n'est pas atteint ; le dernier passage
+      est tronqué si nécessaire.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = config.LLM.CONTEXT_TOKEN_BUDGET,
+        max_overlap: int = config.CHUNKS.OVERLAP,
+    ):
+        self.token_budget = token_budget
+        self.max_overlap = max_overlap
+
+    def _overlap(self, left: str, right: str) -> int:
+        """Longueur du plus long suffixe de `left` qui est aussi un préfixe de `right`."""
+        for size in range(min(len(left), len(right), self.max_overlap), MIN_OVERLAP - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    def merge(self, documents: List[Dict]) -> List[Dict]:
+        """Fusionne les chunks adjacents d'un même fichier et supprime les doublons."""
+        by_file: Dict[str, List[Dict]] = {}
+        for doc in documents:
+            filename = str(doc.get("metadata", {}).get("filename", ""))
+            by_file.setdefault(filename, []).append(doc)
+
+        passages = []
+        for docs in by_file.values():
+            docs = sorted(docs, key=lambda doc: int(doc.get("metadata", {}).get("chunk_index", 0)))
+            current = None
+            for doc in docs:
+                index = int(doc.get("metadata", {}).get("chunk_index", 0))
+                score = doc.get("score", 0.0)
+
+                if current is not None and current["content"] == doc["content"]:
+                    current["score"] = max(current["score"], score)
+                    continue
+
+                if current is not None and index == current["last_index"] + 1:
+                    overlap = self._overlap(current["content"], doc["content"])
+                    if overlap:
+                        current["content"] += doc["content"][overlap:]
+                        current["last_index"] = index
+                        current["score"] = max(current["score"], score)
+                        continue
+
+                current = {"content": doc["content"], "last_index": index, "score": score}
+                passages.append(current)
+
+        return passages
+
+    def assemble(self, documents: List[Dict], model: Llama) -> str:
+        """Retourne le contexte final, borné à `token_budget` tokens."""
+        passages = sorted(self.merge(documents), key=lambda passage: passage["score"], reverse=True)
+
+        selected = []
+        remaining = self.token_budget
+        for passage in passages:
+            if remaining <= 0:
+                break
+
+            tokens = model.tokenize(passage["content"].encode("utf-8"), add_bos=False)
+            if len(tokens) <= remaining:
+                selected.append(passage["content"])
+                remaining -= len(tokens)
+            else:
+                selected.append(
+                    model.detokenize(tokens[:remaining]).decode("utf-8", errors="ignore")
+                )
+                remaining = 0
+
+        return "\n".join(selected)
+
+
+context_assembler = ContextAssembler()
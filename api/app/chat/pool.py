@@ -0,0 +1,204 @@
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from llama_cpp import Llama
+
+from api.app import logger
+from api.app.config import config
+
+
+class ModelPoolTimeoutError(Exception):
+    def __init__(self, model_path: Path, timeout: float):
+        self.model_path = model_path
+        self.timeout = timeout
+
+    def __str__(self):
+        return f"Aucune instance disponible pour le modèle {self.model_path} après {self.timeout}s"
+
+
+class ModelPool:
+    """
+    Pool de modèles GGUF chargés une seule fois et partagés par tout le processus.
+
+    Les instances `Llama` sont indexées par (chemin du modèle, paramètres de chargement).
+    Chaque clé possède `replicas` instances ; une requête emprunte une instance via
+    `checkout()` et la rend automatiquement à la sortie du bloc `with`.
+
+    Le chargement d'un modèle a lieu hors du verrou : les modèles déjà en mémoire restent
+    disponibles pendant qu'un autre se charge. Les appels concurrents pour une même clé
+    attendent le chargement en cours (`_loading`) au lieu de le dupliquer.
+    """
+
+    def __init__(self, replicas: int = config.LLM.REPLICAS):
+        self.replicas = replicas
+        self._lock = threading.Lock()
+        self._available: Dict[Tuple, queue.Queue] = {}
+        self._instances: Dict[Tuple, List[Llama]] = {}
+        self._loading: Dict[Tuple, threading.Event] = {}
+
+    @staticmethod
+    def _params(
+        n_ctx: int = config.LLM.N_CTX,
+        n_gpu_layers: int = config.LLM.N_GPU_LAYERS,
+        chat_format: str = "chatml",
+        # Décodage spéculatif par défaut : le modèle est chargé une seule fois, avec les logits
+        logits_all: bool = config.LLM.SPECULATIVE != "none",
+    ) -> Dict:
+        return {
+            "n_ctx": n_ctx,
+            "n_gpu_layers": n_gpu_layers,
+            "chat_format": chat_format,
+            "logits_all": logits_all,
+        }
+
+    @staticmethod
+    def _key(model_path: Path, params: Dict) -> Tuple:
+        return (Path(model_path).resolve().as_posix(), tuple(sorted(params.items())))
+
+    def key_for(self, model_path: Path = config.MODEL_PATH, **params) -> Tuple:
+        return self._key(model_path, self._params(**params))
+
+    def load(
+        self,
+        model_path: Path = config.MODEL_PATH,
+        replicas: Optional[int] = None,
+        **params,
+    ) -> Tuple:
+        """Charge les répliques du modèle si elles ne sont pas déjà en mémoire."""
+        params = self._params(**params)
+        key = self._key(model_path, params)
+
+        while True:
+            with self._lock:
+                if key in self._instances:
+                    return key
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Chargement en cours dans un autre thread ; en cas d'échec, on retente ici
+            loading.wait()
+
+        try:
+            if not Path(model_path).exists():
+                raise FileNotFoundError(
+                    f"Le fichier spécifié pour le modèle est introuvable : {model_path}"
+                )
+
+            replicas = replicas or self.replicas
+            instances = []
+            for i in range(replicas):
+                logger.info(f"Chargement du modèle {model_path} (réplique {i + 1}/{replicas})")
+                instances.append(Llama(model_path=Path(model_path).as_posix(), verbose=False, **params))
+
+            available = queue.Queue()
+            for instance in instances:
+                available.put(instance)
+
+            with self._lock:
+                self._instances[key] = instances
+                self._available[key] = available
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+        return key
+
+    def warmup(self, model_path: Path = config.MODEL_PATH, **params):
+        """Charge le modèle puis génère un token sur chaque réplique pour initialiser les buffers."""
+        key = self.load(model_path, **params)
+        for instance in self._instances[key]:
+            instance.create_completion("Bonjour", max_tokens=1)
+        logger.info(f"Modèle {model_path} prêt ({len(self._instances[key])} réplique(s))")
+
+    @contextmanager
+    def checkout(
+        self,
+        model_path: Path = config.MODEL_PATH,
+        timeout: float = config.LLM.CHECKOUT_TIMEOUT,
+        **params,
+    ):
+        """Emprunte une instance du modèle et la rend au pool à la fin du bloc."""
+        key = self.load(model_path, **params)
+        available = self._available[key]
+
+        try:
+            instance = available.get(timeout=timeout)
+        except queue.Empty:
+            raise ModelPoolTimeoutError(model_path, timeout)
+
+        try:
+            yield instance
+        finally:
+            available.put(instance)
+
+    def is_loaded(self, key: Tuple) -> bool:
+        return key in self._instances
+
+    @staticmethod
+    def _logits_buffer(params: Dict, n_vocab: int) -> int:
+        """Buffer de scores float32 n_ctx x n_vocab alloué par llama_cpp avec `logits_all`."""
+        return params["n_ctx"] * n_vocab * 4 if params["logits_all"] else 0
+
+    def estimate_memory(self, model_path: Path = config.MODEL_PATH, **params) -> int:
+        """Mémoire (octets) d'une réplique avant chargement : GGUF + buffer de logits éventuel."""
+        params = self._params(**params)
+        path = Path(model_path).resolve().as_posix()
+        # Vocabulaire lu sur une instance déjà chargée du même GGUF, sinon estimé
+        n_vocab = next(
+            (instances[0].n_vocab() for key, instances in self._instances.items() if key[0] == path),
+            config.LLM.VOCAB_SIZE,
+        )
+        return Path(model_path).stat().st_size + self._logits_buffer(params, n_vocab)
+
+    def memory_usage(self, key: Tuple) -> int:
+        """Estimation de la mémoire occupée (octets) : GGUF et buffer de logits par réplique."""
+        params = dict(key[1])
+        return sum(
+            Path(key[0]).stat().st_size + self._logits_buffer(params, instance.n_vocab())
+            for instance in self._instances.get(key, [])
+        )
+
+    def loaded_keys(self) -> List[Tuple]:
+        return list(self._instances.keys())
+
+    def unload(self, key: Tuple) -> bool:
+        """Décharge un modèle si aucune de ses instances n'est empruntée."""
+        with self._lock:
+            instances = self._instances.get(key)
+            if instances is None:
+                return True
+            if self._available[key].qsize() < len(instances):
+                return False
+
+            for instance in instances:
+                instance.close()
+            del self._instances[key]
+            del self._available[key]
+
+        logger.info(f"Modèle {key[0]} déchargé")
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            key[0]: {
+                "replicas": len(instances),
+                "available": self._available[key].qsize(),
+            }
+            for key, instances in self._instances.items()
+        }
+
+    def close(self):
+        with self._lock:
+            for instances in self._instances.values():
+                for instance in instances:
+                    instance.close()
+            self._instances.clear()
+            self._available.clear()
+
+
+model_pool = ModelPool()
@@ -0,0 +1,69 @@
+import threading
+import weakref
+from typing import Callable, List
+
+from llama_cpp import Llama
+from llama_cpp.llama_chat_format import format_chatml
+
+from api.app import logger
+from api.app.config import config
+
+
+class PrefixStateCache:
+    """
+    Réutilisation du cache KV pour le préfixe système commun à toutes les questions.
+
+    Pour chaque instance `Llama`, le préfixe (messages système mis en forme au format chatml)
+    est évalué une seule fois et son état est sauvegardé (`save_state`). Avant chaque requête,
+    si le cache KV de l'instance ne commence plus par ce préfixe, l'état est restauré
+    (`load_state`) : llama_cpp ne réévalue alors que la partie propre à la requête,
+    grâce à sa recherche du plus long préfixe commun.
+    """
+
+    def __init__(
+        self,
+        build_messages: Callable[[str, str], List],
+        enabled: bool = config.LLM.PREFIX_CACHE,
+    ):
+        self.build_messages = build_messages
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._states = weakref.WeakKeyDictionary()
+
+    def _prefix_tokens(self, model: Llama) -> List[int]:
+        # Deux requêtes différentes : leur partie commune est le préfixe constant
+        first = format_chatml(self.build_messages("a", "a")).prompt
+        second = format_chatml(self.build_messages("b", "b")).prompt
+
+        length = 0
+        for char_a, char_b in zip(first, second):
+            if char_a != char_b:
+                break
+            length += 1
+
+        tokens = model.tokenize(first[:length].encode("utf-8"), add_bos=True, special=True)
+        # Le dernier token peut fusionner avec le texte qui suit : on l'écarte
+        return tokens[:-1]
+
+    def restore(self, model: Llama):
+        """Place le cache KV de l'instance sur le préfixe système avant une génération."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            entry = self._states.get(model)
+
+        if entry is None:
+            tokens = self._prefix_tokens(model)
+            model.reset()
+            model.eval(tokens)
+            entry = (tokens, model.save_state())
+            with self._lock:
+                self._states[model] = entry
+            logger.info(f"Préfixe système mis en cache ({len(tokens)} tokens)")
+            return
+
+        tokens, state = entry
+        # Seuls les `n_tokens` premiers tokens du buffer sont évalués ; le reste est périmé
+        if model.n_tokens < len(tokens) or model.input_ids[: len(tokens)].tolist() != tokens:
+            model.load_state(state)
@@ -0,0 +1,160 @@
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic
+from typing import Dict, Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.app import logger
+from api.app.config import config
+from api.app.db.models import LLMRag
+from .pool import ModelPool, model_pool
+
+
+class ModelNotFoundError(Exception):
+    def __init__(self, model_path: Path = config.MODEL_PATH):
+        self.model_path = model_path
+
+    def __str__(self):
+        return f"Le fichier spécifié pour le modèle est introuvable : {self.model_path}"
+
+
+class ModelMemoryBudgetError(Exception):
+    def __init__(self, model_path: Path, budget_mb: int):
+        self.model_path = model_path
+        self.budget_mb = budget_mb
+
+    def __str__(self):
+        return (
+            f"Impossible de charger {self.model_path} sans dépasser le budget mémoire "
+            f"de {self.budget_mb} Mo (modèles chargés en cours d'utilisation)"
+        )
+
+
+class ModelRegistry:
+    """
+    Registre des modèles GGUF déclarés dans la table `llm` (LLMRag).
+
+    Les modèles sont chargés dans le pool à leur première utilisation. Si le chargement
+    dépasse `memory_budget_mb`, les modèles inutilisés les moins récemment utilisés
+    sont déchargés (LRU). Toutes les utilisations doivent passer par `checkout()`
+    pour qu'un modèle en cours d'utilisation ne soit jamais déchargé.
+
+    La place d'un modèle en cours de chargement est réservée sous le verrou, puis le
+    chargement a lieu hors du verrou : les modèles déjà chargés restent utilisables.
+    """
+
+    def __init__(
+        self,
+        pool: ModelPool = model_pool,
+        memory_budget_mb: int = config.LLM.MEMORY_BUDGET_MB,
+    ):
+        self.pool = pool
+        self.memory_budget_mb = memory_budget_mb
+        self._lock = threading.Lock()
+        self._last_used: Dict[tuple, float] = {}
+        self._in_use: Dict[tuple, int] = {}
+        # Modèles en cours de chargement : évènement de fin et mémoire réservée (octets)
+        self._loading: Dict[tuple, threading.Event] = {}
+        self._reserved: Dict[tuple, int] = {}
+
+    async def resolve(self, name: Optional[str], session: AsyncSession) -> Path:
+        """Chemin du GGUF correspondant à `name` (modèle par défaut si `name` est vide)."""
+        if not name:
+            model_path = config.MODEL_PATH
+        else:
+            statement = select(LLMRag).where(LLMRag.llmname == name)
+            result = await session.exec(statement)
+            llm = result.first()
+            model_path = config.MODEL_FOLDER / (llm.llmname if llm else name)
+
+            if llm is None:
+                raise ModelNotFoundError(model_path)
+
+        if not model_path.exists():
+            raise ModelNotFoundError(model_path)
+
+        return model_path
+
+    def _ensure_capacity(self, model_path: Path, needed: int):
+        """Décharge les modèles inactifs les plus anciens jusqu'à pouvoir réserver `needed` octets."""
+        budget = self.memory_budget_mb * 1024 * 1024
+
+        def used():
+            loaded = sum(self.pool.memory_usage(key) for key in self.pool.loaded_keys())
+            return loaded + sum(self._reserved.values())
+
+        candidates = sorted(
+            self.pool.loaded_keys(), key=lambda key: self._last_used.get(key, 0.0)
+        )
+        for key in candidates:
+            if used() + needed <= budget:
+                break
+            if self._in_use.get(key, 0) == 0 and self.pool.unload(key):
+                self._last_used.pop(key, None)
+
+        if used() + needed > budget:
+            raise ModelMemoryBudgetError(model_path, self.memory_budget_mb)
+
+    @contextmanager
+    def checkout(self, model_path: Path = config.MODEL_PATH, **params):
+        """Emprunte une instance du modèle, en le chargeant au besoin."""
+        key = self.pool.key_for(model_path, **params)
+
+        while True:
+            with self._lock:
+                # Compté comme utilisé dès maintenant : ni déchargé ni choisi pour l'éviction
+                if self.pool.is_loaded(key):
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    self._last_used[key] = monotonic()
+                    loading = None
+                    break
+                loading = self._loading.get(key)
+                if loading is None:
+                    needed = self.pool.estimate_memory(model_path, **params) * self.pool.replicas
+                    self._ensure_capacity(model_path, needed)
+                    loading = self._loading[key] = threading.Event()
+                    self._reserved[key] = needed
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+            # Chargement en cours dans un autre thread ; en cas d'échec, on retente ici
+            loading.wait()
+
+        if loading is not None:
+            try:
+                logger.info(f"Chargement à la demande du modèle {model_path}")
+                self.pool.load(model_path, **params)
+            except BaseException:
+                with self._lock:
+                    self._in_use[key] -= 1
+                raise
+            finally:
+                with self._lock:
+                    del self._loading[key]
+                    del self._reserved[key]
+                loading.set()
+            with self._lock:
+                self._last_used[key] = monotonic()
+
+        try:
+            with self.pool.checkout(model_path, **params) as model:
+                yield model
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                self._last_used[key] = monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "memory_budget_mb": self.memory_budget_mb,
+            "memory_used_mb": sum(
+                self.pool.memory_usage(key) for key in self.pool.loaded_keys()
+            )
+            // (1024 * 1024),
+            "in_use": {key[0]: count for key, count in self._in_use.items() if count},
+        }
+
+
+model_registry = ModelRegistry()
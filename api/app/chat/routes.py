@@ -1,28 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import base64
 import io
-from api.app.db.main import get_session
+import json
+from api.app.db.main import get_session, async_session
 from .service import LLMService
+from .pool import model_pool
+from .cache import semantic_cache
+from .registry import model_registry, ModelNotFoundError, ModelMemoryBudgetError
+from .speculative import speculative_stats
+from .scheduler import (
+    generation_scheduler,
+    SchedulerQueueFullError,
+    SchedulerTimeoutError,
+)
 from api.app.vector_db.service import VectorDatabaseService
+from api.app.vector_db.batcher import query_batcher
+from api.app.vector_db.rerank import reranker
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .schemas import Question, Response
 from time import time
-from api.app.db.models import ChatLog
-from api.app.config import config, Path
+from api.app.db.log_writer import chat_log_writer
+from api.app.config import config
 
 
 llm_router = APIRouter()
 
 
-class ModelNotFoundError(Exception):
-    def __init__(self, model_path: Path = config.MODEL_PATH):
-        self.model_path = model_path
-
-    def __str__(self):
-        return f"Le fichier spécifié pour le modèle est introuvable : {self.model_path}"
-
-
 @llm_router.post("/chat/", response_model=Response)
 async def ask_question(
     question: Question,
@@ -33,25 +37,52 @@ async def ask_question(
 ):
 
     try:
-        documents = dbclient.search_best_chunks(question.content)
-        start_time = time()
-
-        model_path = config.MODEL_PATH
-        # print("CHEMIN", model_path.resolve())
-        if not model_path.exists():
-            raise ModelNotFoundError()
-
-        response_content = llm.generate_response(
-            question.content, documents, placeholder
-        )
+        # Modèle demandé (chargé à la première utilisation) ou modèle par défaut
+        model_path = await model_registry.resolve(question.model, session)
+
+        # Collection et encodeur lus une fois : une bascule en cours ne les dépareille pas
+        target = dbclient.target
+        # L'embedding de la question sert à la fois au cache sémantique et à la recherche
+        vector = await query_batcher.encode(question.content, target.encoder)
+        corpus_version = semantic_cache.corpus_version
+        # Une réponse n'est réutilisée que pour la même collection, le même modèle et les mêmes filtres
+        scope = target.collection_name + str(model_path) + question.cache_scope
+        cached = semantic_cache.lookup(vector, scope=scope)
+        rerank_time = None
+
+        if cached is not None:
+            start_time = time()
+            response_content, documents = cached
+        else:
+            # Sur-échantillonnage puis reclassement par le cross-encoder (si activé)
+            documents = await dbclient.search_best_chunks(
+                question.content,
+                k=reranker.candidates,
+                vector=vector,
+                hnsw_ef=question.hnsw_ef,
+                file_uids=question.file_uids,
+                metadata=question.metadata,
+                target=target,
+            )
+            documents, rerank_time = await reranker.rerank(question.content, documents)
+            start_time = time()
+
+            # La génération tourne sur l'exécuteur de l'ordonnanceur, pas sur la boucle d'évènements
+            response_content = await generation_scheduler.run(
+                llm.generate_response,
+                question.content,
+                documents,
+                placeholder,
+                model_path=model_path,
+                speculative=question.speculative,
+            )
+            semantic_cache.store(vector, response_content, documents, corpus_version, scope=scope)
         end_time = time()
 
         duration = str(end_time - start_time)
 
-        new_chat_log = ChatLog(question=question.content, response=response_content)
-        session.add(new_chat_log)
-        await session.commit()  # <---- a revoir
-        # await session.refresh(new_chat_log)
+        # Insertion différée et groupée : aucun aller-retour Postgres sur le chemin de la réponse
+        chat_log_writer.write(question=question.content, response=response_content)
 
     except ModelNotFoundError as e:
         await session.rollback()
@@ -60,6 +91,14 @@ async def ask_question(
             detail=str(e),
         )
 
+    except (SchedulerQueueFullError, SchedulerTimeoutError, ModelMemoryBudgetError) as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+
     except Exception as e:
         await session.rollback()
         raise HTTPException(
@@ -70,8 +109,126 @@ async def ask_question(
     else:
 
         return Response(
-            content=new_chat_log.response, response_time=duration, documents=documents
+            content=response_content,
+            response_time=duration,
+            documents=documents,
+            speculative=llm.speculative_stats,
+            rerank_time=rerank_time,
+        )
+
+
+def _sse(event: str, data) -> str:
+    """Formate un évènement server-sent events."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@llm_router.post("/chat/stream")
+async def ask_question_stream(
+    question: Question,
+    llm: LLMService = Depends(LLMService),
+    dbclient: VectorDatabaseService = Depends(VectorDatabaseService),
+):
+    # Les temps rapportés incluent l'embedding, la recherche et le reclassement
+    request_start = time()
+    try:
+        async with async_session() as session:
+            model_path = await model_registry.resolve(question.model, session)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    target = dbclient.target
+    vector = await query_batcher.encode(question.content, target.encoder)
+    corpus_version = semantic_cache.corpus_version
+    scope = target.collection_name + str(model_path) + question.cache_scope
+    cached = semantic_cache.lookup(vector, scope=scope)
+    rerank_time = None
+
+    # Rejet immédiat si la file est pleine, avant d'ouvrir le flux
+    if cached is None:
+        try:
+            generation_scheduler.check_capacity()
+        except SchedulerQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+        documents = await dbclient.search_best_chunks(
+            question.content,
+            k=reranker.candidates,
+            vector=vector,
+            hnsw_ef=question.hnsw_ef,
+            file_uids=question.file_uids,
+            metadata=question.metadata,
+            target=target,
+        )
+        documents, rerank_time = await reranker.rerank(question.content, documents)
+    else:
+        cached_content, documents = cached
+
+    async def event_stream(start_time: float):
+        first_token_time = None
+        tokens = []
+
+        # Les documents partent avant la génération pour un affichage immédiat
+        yield _sse("documents", documents)
+
+        if cached is not None:
+            # Réponse déjà connue : envoyée en un seul évènement
+            first_token_time = time()
+            tokens.append(cached_content)
+            yield _sse("token", {"content": cached_content})
+        else:
+            try:
+                async for token in generation_scheduler.iterate(
+                    llm.stream_response(
+                        question.content,
+                        documents,
+                        model_path=model_path,
+                        speculative=question.speculative,
+                    )
+                ):
+                    if first_token_time is None:
+                        first_token_time = time()
+                    tokens.append(token)
+                    yield _sse("token", {"content": token})
+            except Exception as e:
+                yield _sse("error", {"detail": f"Erreur lors de la génération de réponse : {str(e)}"})
+                return
+
+        end_time = time()
+        content = "".join(tokens)
+        if cached is None:
+            semantic_cache.store(vector, content, documents, corpus_version, scope=scope)
+        yield _sse(
+            "done",
+            {
+                "content": content,
+                "response_time": str(end_time - start_time),
+                "time_to_first_token": str((first_token_time or end_time) - start_time),
+                "speculative": llm.speculative_stats,
+                "rerank_time": rerank_time,
+            },
         )
+        chat_log_writer.write(question=question.content, response=content)
+
+    return StreamingResponse(
+        event_stream(request_start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@llm_router.get("/chat/stats")
+async def get_chat_stats():
+    """Profondeur de file, temps d'attente et occupation des modèles."""
+    return {
+        "scheduler": generation_scheduler.stats(),
+        "models": model_pool.stats(),
+        "registry": model_registry.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "speculative": speculative_stats.stats(),
+        "query_embedding": query_batcher.stats(),
+        "rerank": reranker.stats(),
+        "vector_search": VectorDatabaseService().stats(),
+    }
 
 
 @llm_router.get("/telecharger/{filename}")
@@ -0,0 +1,142 @@
+import asyncio
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, Iterator, Optional
+
+from api.app.config import config
+
+
+class SchedulerQueueFullError(Exception):
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+
+    def __str__(self):
+        return f"File d'attente de génération pleine ({self.max_queue} requêtes en attente)"
+
+
+class SchedulerTimeoutError(Exception):
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+
+    def __str__(self):
+        return f"Aucun créneau de génération disponible après {self.timeout}s d'attente"
+
+
+_END_OF_STREAM = object()
+
+
+class GenerationScheduler:
+    """
+    Ordonnanceur des générations LLM.
+
+    Les générations (bloquantes) tournent sur un exécuteur dédié pour ne jamais bloquer
+    la boucle d'évènements. Au plus `max_concurrency` générations s'exécutent en même temps,
+    au plus `max_queue` requêtes attendent un créneau (au-delà : rejet immédiat), et chaque
+    requête abandonne l'attente après `timeout` secondes.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = config.SCHEDULER.MAX_CONCURRENCY,
+        max_queue: int = config.SCHEDULER.MAX_QUEUE,
+        timeout: float = config.SCHEDULER.QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="generation"
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self._wait_times = deque(maxlen=1000)
+        self._counters = {"completed": 0, "rejected": 0, "timed_out": 0}
+
+    def check_capacity(self):
+        """Rejette immédiatement la requête si la file d'attente est pleine."""
+        if self._waiting >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise SchedulerQueueFullError(self.max_queue)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        self.check_capacity()
+        timeout = timeout or self.timeout
+
+        self._waiting += 1
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._counters["timed_out"] += 1
+            raise SchedulerTimeoutError(timeout)
+        finally:
+            self._waiting -= 1
+
+        self._wait_times.append(perf_counter() - start)
+        self._running += 1
+
+    def release(self):
+        self._running -= 1
+        self._counters["completed"] += 1
+        self._semaphore.release()
+
+    async def run(self, fn, *args, timeout: Optional[float] = None, **kwargs):
+        """Exécute `fn` sur l'exécuteur de génération dès qu'un créneau est libre."""
+        await self.acquire(timeout)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self.release()
+
+    async def iterate(self, generator: Iterator, timeout: Optional[float] = None):
+        """Consomme un générateur synchrone sur l'exécuteur, un élément à la fois."""
+        await self.acquire(timeout)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                item = await loop.run_in_executor(
+                    self.executor, next, generator, _END_OF_STREAM
+                )
+                if item is _END_OF_STREAM:
+                    break
+                yield item
+        finally:
+            # Libère les ressources du générateur même si le client se déconnecte
+            try:
+                generator.close()
+            except ValueError:
+                # Générateur encore en cours sur l'exécuteur : il sera fermé par le ramasse-miettes
+                pass
+            self.release()
+
+    def stats(self) -> Dict:
+        wait_times = sorted(self._wait_times)
+        count = len(wait_times)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self._waiting,
+            "running": self._running,
+            **self._counters,
+            "wait_time": {
+                "count": count,
+                "mean": sum(wait_times) / count if count else 0.0,
+                "p50": wait_times[count // 2] if count else 0.0,
+                "p95": wait_times[int(count * 0.95)] if count else 0.0,
+                "max": wait_times[-1] if count else 0.0,
+            },
+        }
+
+    def shutdown(self):
+        # Les générations en file sont annulées ; on attend la fin de celles en cours,
+        # qui utilisent encore un contexte llama.cpp que `model_pool.close` va libérer
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+generation_scheduler = GenerationScheduler()
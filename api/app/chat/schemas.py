@@ -1,11 +1,28 @@
-from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional, Union
+import json
+from pydantic import BaseModel, Field
 
 
 class Response(BaseModel):
     content: str
     response_time: str
     documents: list
+    speculative: Optional[Dict] = None  # Tokens proposés / acceptés si décodage spéculatif
+    rerank_time: Optional[float] = None  # Durée du reclassement en ms (None si désactivé)
 
 
 class Question(BaseModel):
     content: str
+    model: Optional[str] = None  # Nom d'un modèle de la table `llm` ; modèle par défaut sinon
+    speculative: Optional[Literal["none", "prompt_lookup", "draft_model"]] = None
+    hnsw_ef: Optional[int] = Field(default=None, gt=0)  # Largeur de recherche HNSW : rappel plus élevé contre latence
+    file_uids: Optional[List[str]] = None  # Limite la recherche à ces fichiers
+    metadata: Optional[Dict[str, Union[str, int, bool, List[str], List[int]]]] = None  # metadata.<clé> = valeur(s)
+
+    @property
+    def cache_scope(self) -> str:
+        """Filtres de la question, inclus dans la portée du cache sémantique."""
+        return json.dumps(
+            {"file_uids": sorted(self.file_uids or []), "metadata": self.metadata or {}},
+            sort_keys=True,
+        )
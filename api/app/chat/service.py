@@ -1,74 +1,101 @@
 import os
+from contextlib import ExitStack, contextmanager
+from typing import Optional
 from langchain_openai import ChatOpenAI
-from langchain_community.callbacks import StreamlitCallbackHandler
 from langchain.prompts import PromptTemplate
 from api.app.config import config
-from llama_cpp import Llama
+from .registry import model_registry
+from .prefix_cache import PrefixStateCache
+from .context import context_assembler
+from .speculative import prompt_lookup_draft, small_model_draft, speculative_stats
 
 
 class LLMService:
+    def __init__(self):
+        # Statistiques de décodage spéculatif de la dernière génération
+        self.speculative_stats = None
 
-    @staticmethod
-    def _get_models(
-        model_path = config.MODEL_PATH,
-        n_gpu_layers=-1,
-        max_tokens: int = 1024,
-        streaming: bool = False,
-        placeholder=None,  # streamlit
-    ):
-        # print(model_path)
-        if not model_path.exists():
-            raise FileNotFoundError(
-                f"Le fichier spécifié pour le modèle est introuvable : {model_path}"
-            )
-        # print(model_path)
-        default_params = {
-            "model_path": model_path.as_posix(),
-            "chat_format": "chatml",
-            "n_gpu_layers": n_gpu_layers,
-            "streaming": streaming,
-            "max_tokens": max_tokens,
-            "streaming": streaming,
-            "n_ctx": n_ctx,
-            "callbacks": (
-                [StreamlitCallbackHandler(placeholder)] if placeholder else None
-            ),
-        }
+    @contextmanager
+    def _checkout(self, model_path, speculative: Optional[str] = None):
+        """Emprunte une instance du modèle, configurée pour le décodage spéculatif si demandé."""
+        mode = speculative or config.LLM.SPECULATIVE
+        if mode == "none":
+            with model_registry.checkout(model_path) as model:
+                yield model
+            return
 
-        return Llama(**default_params)
+        with ExitStack() as stack:
+            # Le décodage spéculatif nécessite les logits de toutes les positions ; si c'est le
+            # mode par défaut (LLM.SPECULATIVE), il s'agit de la même instance que sans brouillon
+            model = stack.enter_context(model_registry.checkout(model_path, logits_all=True))
+            if mode == "draft_model":
+                if config.LLM.DRAFT_MODEL_PATH is None:
+                    raise ValueError("Aucun modèle de brouillon configuré (LLM.DRAFT_MODEL_PATH)")
+                draft = stack.enter_context(
+                    model_registry.checkout(
+                        config.MODEL_FOLDER / config.LLM.DRAFT_MODEL_PATH, logits_all=False
+                    )
+                )
+                draft_model = small_model_draft(model, draft)
+            else:
+                draft_model = prompt_lookup_draft()
 
-    def generate_response(self, question: str, documents, placeholder=None):
-        try:
-            context = "\n".join(doc["content"] for doc in documents)
+            model.draft_model = draft_model
+            try:
+                yield model
+            finally:
+                model.draft_model = None
+                self.speculative_stats = draft_model.finish(model)
+                speculative_stats.record(mode, self.speculative_stats)
 
-            # On suppose que documents contient un dictionnaire avec un champ 'content'
-            # print("\nTHE CHUNK USED IS :", context, "\n")
-            # Structurer les messages pour correspondre au format attendu par le modèle
-            # Instructions strictes pour le modèle
-            system_prompt = (
-                "Réponds uniquement à la question en te basant sur le contexte fourni. "
-                "Tu es un assistant multilingue et tu dois toujours répondre dans la langue de la question. "
-                "Si la réponse n'est pas présente dans le contexte, dis uniquement 'Je ne sais pas' sans ajouter autre chose."
-            )
+    @staticmethod
+    def _build_messages(question: str, context: str) -> list:
+        # On suppose que documents contient un dictionnaire avec un champ 'content'
+        # print("\nTHE CHUNK USED IS :", context, "\n")
+        # Structurer les messages pour correspondre au format attendu par le modèle
+        # Instructions strictes pour le modèle
+        system_prompt = (
+            "Réponds uniquement à la question en te basant sur le contexte fourni. "
+            "Tu es un assistant multilingue et tu dois toujours répondre dans la langue de la question. "
+            "Si la réponse n'est pas présente dans le contexte, dis uniquement 'Je ne sais pas' sans ajouter autre chose."
+        )
 
-            messages = [
-                # Instruction générale au modèle
-                {"role": "system", "content": system_prompt},
-                # Introduction au contexte
-                {
-                    "role": "system",
-                    "content": "Voici les informations contextuelles pertinentes à utiliser pour répondre :",
-                },
-                # Contexte réel
-                {
-                    "role": "assistant",
-                    "content": context,
-                },
-                {"role": "user", "content": question},
-            ]
+        return [
+            # Instruction générale au modèle
+            {"role": "system", "content": system_prompt},
+            # Introduction au contexte
+            {
+                "role": "system",
+                "content": "Voici les informations contextuelles pertinentes à utiliser pour répondre :",
+            },
+            # Contexte réel
+            {
+                "role": "assistant",
+                "content": context,
+            },
+            {"role": "user", "content": question},
+        ]
 
-            model = self._get_models()
-            response = model.create_chat_completion(messages=messages, temperature=0.2,top_k=20)
+    def generate_response(
+        self,
+        question: str,
+        documents,
+        placeholder=None,
+        model_path=config.MODEL_PATH,
+        speculative: Optional[str] = None,
+    ):
+        try:
+            # Le modèle reste chargé dans le pool : on emprunte une instance le temps de la génération
+            with self._checkout(model_path, speculative) as model:
+                context = context_assembler.assemble(documents, model)
+                messages = self._build_messages(question, context)
+                prefix_cache.restore(model)
+                response = model.create_chat_completion(
+                    messages=messages,
+                    temperature=0.2,
+                    top_k=20,
+                    max_tokens=config.LLM.MAX_TOKENS,
+                )
 
             # print("Réponse brute du modèle:", response)
             if response and "choices" in response and len(response["choices"]) > 0:
@@ -82,3 +109,35 @@ class LLMService:
         except Exception as e:
             print(f"Erreur lors de la génération de la réponse : {e} -> (llmodeling)")
             raise e
+
+    def stream_response(
+        self,
+        question: str,
+        documents,
+        model_path=config.MODEL_PATH,
+        speculative: Optional[str] = None,
+    ):
+        """Génère la réponse token par token (générateur de fragments de texte)."""
+        try:
+            # L'instance reste empruntée jusqu'à la fin du flux
+            with self._checkout(model_path, speculative) as model:
+                context = context_assembler.assemble(documents, model)
+                messages = self._build_messages(question, context)
+                prefix_cache.restore(model)
+                for chunk in model.create_chat_completion(
+                    messages=messages,
+                    temperature=0.2,
+                    top_k=20,
+                    max_tokens=config.LLM.MAX_TOKENS,
+                    stream=True,
+                ):
+                    delta = chunk["choices"][0]["delta"]
+                    if delta.get("content"):
+                        yield delta["content"]
+
+        except Exception as e:
+            print(f"Erreur lors de la génération de la réponse : {e} -> (llmodeling)")
+            raise e
+
+
+prefix_cache = PrefixStateCache(LLMService._build_messages)
@@ -0,0 +1,121 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+from api.app.config import config
+
+SPECULATIVE_MODES = ("none", "prompt_lookup", "draft_model")
+
+
+class SmallModelDraft(LlamaDraftModel):
+    """Brouillon proposé par un petit modèle GGUF (même vocabulaire que le modèle principal)."""
+
+    def __init__(self, model: Llama, num_pred_tokens: int = config.LLM.SPECULATIVE_TOKENS):
+        self.model = model
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids: npt.NDArray[np.intc], /, **kwargs) -> npt.NDArray[np.intc]:
+        tokens = []
+        # Décodage glouton ; `generate` réutilise le cache KV du plus long préfixe commun
+        for token in self.model.generate(input_ids.tolist(), top_k=1, temp=0.0, reset=True):
+            tokens.append(token)
+            if len(tokens) >= self.num_pred_tokens or token == self.model.token_eos():
+                break
+        return np.array(tokens, dtype=np.intc)
+
+
+class MeasuredDraftModel(LlamaDraftModel):
+    """
+    Enveloppe un modèle de brouillon pour mesurer le taux d'acceptation.
+
+    llama_cpp n'expose pas le nombre de tokens acceptés : à chaque appel, on compare
+    le brouillon précédent aux tokens réellement retenus, qui suivent désormais
+    la position où ce brouillon avait été proposé.
+    """
+
+    def __init__(self, draft_model: LlamaDraftModel):
+        self.draft_model = draft_model
+        self.proposed = 0
+        self.accepted = 0
+        self._last: Optional[Tuple[int, List[int]]] = None
+
+    def _account(self, input_ids):
+        if self._last is None:
+            return
+        start, draft = self._last
+        actual = list(input_ids[start : start + len(draft)])
+        for proposed, kept in zip(draft, actual):
+            if proposed != kept:
+                break
+            self.accepted += 1
+        self._last = None
+
+    def __call__(self, input_ids: npt.NDArray[np.intc], /, **kwargs) -> npt.NDArray[np.intc]:
+        self._account(input_ids)
+        draft = self.draft_model(input_ids, **kwargs)
+        self._last = (len(input_ids), draft.tolist())
+        self.proposed += len(draft)
+        return draft
+
+    def finish(self, model: Llama) -> Dict:
+        """Comptabilise le dernier brouillon et retourne les statistiques de la requête."""
+        # `input_ids` s'arrête à `n_tokens` : au-delà, le buffer garde les tokens rejetés
+        self._account(model.input_ids)
+        return {
+            "proposed": self.proposed,
+            "accepted": self.accepted,
+            "acceptance_rate": self.accepted / self.proposed if self.proposed else 0.0,
+        }
+
+
+class SpeculativeStats:
+    """Statistiques cumulées par mode de décodage spéculatif."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {
+            mode: {"requests": 0, "proposed": 0, "accepted": 0}
+            for mode in SPECULATIVE_MODES
+            if mode != "none"
+        }
+
+    def record(self, mode: str, stats: Dict):
+        with self._lock:
+            totals = self._totals[mode]
+            totals["requests"] += 1
+            totals["proposed"] += stats["proposed"]
+            totals["accepted"] += stats["accepted"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                mode: {
+                    **totals,
+                    "acceptance_rate": (
+                        totals["accepted"] / totals["proposed"] if totals["proposed"] else 0.0
+                    ),
+                }
+                for mode, totals in self._totals.items()
+            }
+
+
+def prompt_lookup_draft() -> MeasuredDraftModel:
+    return MeasuredDraftModel(
+        LlamaPromptLookupDecoding(num_pred_tokens=config.LLM.SPECULATIVE_TOKENS)
+    )
+
+
+def small_model_draft(model: Llama, draft: Llama) -> MeasuredDraftModel:
+    if draft.n_vocab() != model.n_vocab():
+        raise ValueError(
+            "Le modèle de brouillon doit partager le vocabulaire du modèle principal "
+            f"({draft.n_vocab()} != {model.n_vocab()})"
+        )
+    return MeasuredDraftModel(SmallModelDraft(draft))
+
+
+speculative_stats = SpeculativeStats()
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import List, Optional, Type
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
@@ -7,6 +7,8 @@ from pathlib import Path
 
 from enum import Enum
 
+config_2dir = Path(__file__).parent.parent
+
 
 class EMBEDDING_MODEL(Enum):
     EMBASS: str = "embaas/sentence-transformers-e5-large-v2"
@@ -27,7 +29,102 @@ class Chunks(BaseModel):
         return self.value
 
 
-config_2dir = Path(__file__).parent.parent
+class EmbeddingSettings(BaseModel):
+    DEVICES: List[str] = ["cuda:1", "cuda:0", "cpu"]  # Par ordre de préférence, repli sur le CPU
+    BACKEND: str = "torch"  # "torch" ou "onnx" (int8 via onnxruntime, pour les nœuds CPU)
+    ONNX_FOLDER: Path = config_2dir / "app/vector_db/onnx_models/"
+    ONNX_QUANTIZATION: str = "avx2"  # "arm64", "avx2", "avx512" ou "avx512_vnni"
+    ONNX_PARITY_THRESHOLD: float = 0.98  # Similarité cosinus minimale avec PyTorch
+    PROCESSES: int = 0  # Processus d'encodage CPU pour l'ingestion (0 ou 1 : désactivé)
+    MULTIPROCESS_THRESHOLD: int = 1000  # Nombre de chunks à partir duquel le pool est utilisé
+    OUTPUT_DIM: Optional[int] = None  # Troncature Matryoshka (ex. 256 ou 512 pour mxbai)
+    BATCH_SIZE: int = 32  # Textes encodés par passe du modèle
+    FP16: bool = False  # Demi-précision sur GPU
+    UPSERT_BATCH_SIZE: int = 256  # Points envoyés par requête Qdrant
+    UPSERT_WAIT: bool = True  # Attendre l'indexation Qdrant avant de rendre la main
+    QUERY_BATCH_SIZE: int = 32  # Questions max encodées ensemble
+    QUERY_BATCH_WAIT_MS: float = 5  # Attente max pour compléter un lot sous charge
+    CACHE_ENABLED: bool = True  # Cache persistant (modèle, hash du texte) -> embedding
+    CACHE_PATH: Path = config_2dir / "embedding_cache.sqlite3"
+    CACHE_MAX_ENTRIES: int = 1_000_000
+
+
+class QdrantSettings(BaseModel):
+    BACKEND: str = "server"  # "server" (QDRANT_URL) ou "local" (Qdrant embarqué, sans serveur)
+    LOCAL_PATH: Optional[Path] = config_2dir / "qdrant_local/"  # Backend "local" ; None : en mémoire
+    PREFER_GRPC: bool = False  # gRPC (port GRPC_PORT) plutôt que REST : moins de surcoût par appel
+    GRPC_PORT: int = 6334
+    TIMEOUT: int = 60  # Secondes
+    ALIAS: Optional[str] = None  # Alias de la collection servie ; None : "<COLLECTION_NAME>_live"
+    ALIAS_REFRESH_S: float = 5  # Intervalle de vérification de la cible de l'alias par l'API
+    QUANTIZATION: str = "none"  # "none", "scalar" (int8, RAM / 4) ou "binary" (RAM / 32)
+    QUANTILE: float = 0.99  # Quantile utilisé pour borner les valeurs en quantification scalaire
+    ALWAYS_RAM: bool = True  # Vecteurs quantifiés gardés en RAM
+    ON_DISK: bool = True  # Vecteurs originaux (float32) sur disque, seulement si QUANTIZATION != "none"
+    RESCORE: bool = True  # Recalcule le score des candidats avec les vecteurs originaux
+    OVERSAMPLING: float = 2.0  # Candidats quantifiés examinés = limit x oversampling
+    HNSW_M: int = 16  # Liens par nœud du graphe HNSW (mémoire / rappel)
+    HNSW_EF_CONSTRUCT: int = 100  # Largeur de recherche à la construction de l'index
+    HNSW_EF: Optional[int] = None  # Largeur de recherche par défaut (None : valeur du serveur)
+    # Champs filtrés (uid du fichier, contraintes `metadata` des questions), indexés en "keyword"
+    PAYLOAD_INDEXES: List[str] = ["metadata.filename"]
+    HYBRID: bool = False  # Vecteur creux BM25 en plus du dense, fusion RRF (ré-indexation requise)
+    HYBRID_PREFETCH: int = 20  # Candidats récupérés par chaque branche (dense / creuse) avant fusion
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    BM25_AVG_LENGTH: float = 256  # Longueur moyenne estimée d'un chunk, en tokens
+
+
+class LLMSettings(BaseModel):
+    N_CTX: int = 4096
+    N_GPU_LAYERS: int = -1
+    MAX_TOKENS: int = 1024
+    REPLICAS: int = 1  # Nombre d'instances Llama chargées par modèle
+    WARMUP: bool = True
+    CHECKOUT_TIMEOUT: float = 300  # Secondes d'attente max pour obtenir une instance
+    PREFIX_CACHE: bool = True  # Réutilise l'état KV du prompt système entre les requêtes
+    CONTEXT_TOKEN_BUDGET: int = 2048  # Tokens max consacrés aux chunks dans le prompt
+    MEMORY_BUDGET_MB: int = 16384  # RAM/VRAM max pour l'ensemble des modèles chargés
+    SPECULATIVE: str = "none"  # Mode par défaut : "none", "prompt_lookup" ou "draft_model"
+    SPECULATIVE_TOKENS: int = 10  # Tokens proposés par brouillon
+    DRAFT_MODEL_PATH: Optional[Path] = None  # Petit GGUF (même vocabulaire) pour "draft_model"
+    VOCAB_SIZE: int = 152064  # Estimation du buffer de logits (logits_all) avant chargement ; Qwen2
+
+
+class RerankSettings(BaseModel):
+    ENABLED: bool = False
+    MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Cross-encoder multilingue
+    DEVICES: List[str] = ["cuda:0", "cpu"]
+    CANDIDATES: int = 50  # Chunks demandés à Qdrant avant reclassement
+    BATCH_SIZE: int = 64
+    LATENCY_BUDGET_MS: float = 300  # Au-delà, ordre de la recherche vectorielle conservé
+    CACHE_SIZE: int = 10000  # Scores (question, chunk) conservés
+
+
+class ReindexSettings(BaseModel):
+    BATCH_FILES: int = 8  # Fichiers convertis et encodés par lot (un point de reprise par lot)
+    WORKERS: int = 2  # Conversions Docling en parallèle
+    STATE_PATH: Path = config_2dir / "reindex_state.json"  # Progression, pour reprendre un job interrompu
+    API_WAIT_TIMEOUT: float = 60  # Attente max (s) que l'API serve la nouvelle collection avant --drop-previous
+
+
+class SchedulerSettings(BaseModel):
+    MAX_CONCURRENCY: int = 1  # A aligner sur LLM.REPLICAS
+    MAX_QUEUE: int = 16
+    QUEUE_TIMEOUT: float = 60  # Secondes d'attente max dans la file
+
+
+class SemanticCacheSettings(BaseModel):
+    ENABLED: bool = True
+    SIMILARITY_THRESHOLD: float = 0.95  # Similarité cosinus minimale pour réutiliser une réponse
+    TTL: float = 3600  # Secondes
+    MAX_SIZE: int = 1024
+
+
+class ChatLogSettings(BaseModel):
+    BATCH_SIZE: int = 100  # Logs insérés par transaction
+    FLUSH_INTERVAL: float = 2.0  # Secondes max avant insertion d'un lot incomplet
+    MAX_QUEUE: int = 10000
 
 
 # print(config_dir)
@@ -40,11 +137,19 @@ class Settings(BaseSettings):
         EMBEDDING_MODEL.MXBAI
     )  # EMBEDDING_MODEL.MINILM, EMBEDDING_MODEL.BAAI, EMBEDDING_MODEL.INFLOAT, EMBEDDING_MODEL.MXBAI
     CHUNKS: Chunks = Chunks()
+    EMBEDDING: EmbeddingSettings = EmbeddingSettings()
+    QDRANT: QdrantSettings = QdrantSettings()
     NUMBER_BEST_CHUNKS: float = 3
     CHUNK_TOLERANCE_FACTOR: float = 1.5
     MODEL_PATH: Path = config_2dir / "app/chat/llm_models/qwen2-7b-instruct-q5_k_m.gguf"
     PDF_FOLDER: Path = config_2dir / "dossier/"
     MODEL_FOLDER: Path = config_2dir / "app/chat/llm_models/"
+    LLM: LLMSettings = LLMSettings()
+    RERANK: RerankSettings = RerankSettings()
+    REINDEX: ReindexSettings = ReindexSettings()
+    SCHEDULER: SchedulerSettings = SchedulerSettings()
+    SEMANTIC_CACHE: SemanticCacheSettings = SemanticCacheSettings()
+    CHAT_LOG: ChatLogSettings = ChatLogSettings()
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
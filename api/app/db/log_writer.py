@@ -0,0 +1,89 @@
+import asyncio
+from typing import List, Optional
+
+from api.app import logger
+from api.app.config import config
+from api.app.db.main import async_session
+from api.app.db.models import ChatLog
+
+
+class ChatLogWriter:
+    """
+    Écriture des ChatLog en arrière-plan.
+
+    Les routes déposent les logs dans une file en mémoire sans attendre la base ;
+    une tâche de fond les insère par lots de `batch_size`, ou toutes les
+    `flush_interval` secondes, et vide la file à l'arrêt de l'application.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = config.CHAT_LOG.BATCH_SIZE,
+        flush_interval: float = config.CHAT_LOG.FLUSH_INTERVAL,
+        max_queue: int = config.CHAT_LOG.MAX_QUEUE,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    def write(self, question: str, response: str):
+        """Dépose un log dans la file, sans jamais bloquer la requête."""
+        if self._queue is None:
+            logger.error("ChatLogWriter non démarré : log ignoré")
+            return
+        try:
+            self._queue.put_nowait(ChatLog(question=question, response=response))
+        except asyncio.QueueFull:
+            logger.error("File des ChatLog pleine : log ignoré")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[ChatLog]):
+        try:
+            async with async_session() as session:
+                session.add_all(batch)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Impossible d'enregistrer {len(batch)} ChatLog : {e}")
+
+    async def stop(self):
+        """Insère les logs restants puis arrête la tâche de fond."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+
+chat_log_writer = ChatLogWriter()
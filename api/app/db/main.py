@@ -8,6 +8,10 @@ from api.app.config import config
 
 async_engine = AsyncEngine(create_engine(url=config.DATABASE_URL))
 
+async_session = sessionmaker(
+    bind=async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 
 async def init_db() -> None:
     async with async_engine.begin() as conn:
@@ -15,11 +19,7 @@ async def init_db() -> None:
 
 
 async def get_session():
-    Session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-
-    async with Session() as session:
+    async with async_session() as session:
         yield session
 
 
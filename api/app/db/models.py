@@ -55,6 +55,23 @@ class LLMRag(SQLModel, table=True):
     def __repr__(self):
         return f"<FileRag {self.llmname}>"
 
+class VectorCollection(SQLModel, table=True):
+    """Schéma des vecteurs d'une collection Qdrant versionnée, pour l'encodeur des questions."""
+
+    __tablename__ = "vector_collections"
+    __table_args__ = {
+        "extend_existing": True,
+    }
+
+    name: str = Field(sa_column=Column(pg.TEXT, primary_key=True))
+    embedding_model: str = Field(sa_column=Column(pg.TEXT, nullable=False))
+    output_dim: Optional[int] = Field(default=None, sa_column=Column(pg.INTEGER, nullable=True))
+    hybrid: bool = Field(sa_column=Column(pg.BOOLEAN, nullable=False))
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+
+    def __repr__(self):
+        return f"<VectorCollection {self.name} ({self.embedding_model})>"
+
 class ChatLog(SQLModel, table=True):
     __tablename__ = "chat_logs"
     __table_args__ = {
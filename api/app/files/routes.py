@@ -9,6 +9,7 @@ from api.app.vector_db.service import ChunkService, VectorDatabaseService
 from api.app.db.main import get_session
 from api.app.db.models import FileRag
 from api.app.db.models import LLMRagRag
+from api.app.chat.cache import semantic_cache
 from .service import FileService
 
 file_router = APIRouter()
@@ -53,7 +54,8 @@ async def create_rag_data_from_file(
 
         # chunk_service.create_chunks(file_for_chunk_data=new_file_for_chunk)
         chunk_service.create_chunks_from_text(file_for_chunk_data=new_file_for_chunk)
-        vectordb_service.create_vectors(chunks=chunk_service.chunks)
+        await vectordb_service.create_vectors(chunks=chunk_service.chunks)
+        semantic_cache.invalidate()  # Le corpus a changé
 
         # Log succès
         logger.info("Chunks et vecteurs créés avec succès")
@@ -84,7 +86,8 @@ async def get_file_by_id(
 @file_router.delete("/delete_file", status_code=status.HTTP_201_CREATED)
 async def delete_file(file_id: str, session: AsyncSession = Depends(get_session)):
 
-    vectordb_service.delete_vectors(key="metadata.filename", value=file_id)
+    await vectordb_service.delete_vectors(key="metadata.filename", value=file_id)
+    semantic_cache.invalidate()  # Le corpus a changé
     await file_service.delete_file(file_uid=file_id, session=session)
 
     return f"The file {file_id} is removed"
@@ -96,7 +99,8 @@ async def delete_files(
 ):
 
     for file_id in file_ids:
-        vectordb_service.delete_vectors(key="metadata.filename", value=file_id)
+        await vectordb_service.delete_vectors(key="metadata.filename", value=file_id)
+        semantic_cache.invalidate()  # Le corpus a changé
         await file_service.delete_file(file_uid=file_id, session=session)
 
     return "All files are deleted"
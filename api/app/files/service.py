@@ -98,6 +98,14 @@ class FileService:
         )
         self.parsed_file = None
 
+    def convert(self, filename: str, file_bytes_stream: bytes, export_to: str = "markdown") -> str:
+        """Convertit un document source (ex. fichier de `dossier/`) en Markdown ou HTML."""
+        source = DocumentStream(name=filename, stream=io.BytesIO(file_bytes_stream))
+        document = self.converter.convert(source).document
+        if export_to == "html":
+            return document.export_to_html()
+        return document.export_to_markdown(image_mode=ImageRefMode.REFERENCED)
+
     @staticmethod
     async def get_all_files(session: AsyncSession):
         statement = select(FileRag).order_by(desc(FileRag.created_at))
@@ -131,12 +139,10 @@ class FileService:
             filename=file_data.filename, file_bytes_stream=file_bytes_stream
         )
 
-        source = DocumentStream(
-            name=file_data.filename, stream=io.BytesIO(file_bytes_stream)
-        )
         logger.debug(f"Fichier {file_data.filename} prêt pour la conversion.")
         try:
-            docling_document_from_file = self.converter.convert(source).document
+            # Même conversion que la ré-indexation : le Markdown indexé ne dépend pas du chemin
+            self.parsed_file = self.convert(file_data.filename, file_bytes_stream, export_to=export_to)
         except Exception as e:
             logger.error(
                 f"Erreur de conversion pour le fichier {file_data.filename}: {e}"
@@ -147,14 +153,6 @@ class FileService:
             )
 
         # Enregistrement du fichier dans la base de données
-        if export_to == "markdown":
-            self.parsed_file = docling_document_from_file.export_to_markdown(
-                image_mode=ImageRefMode.REFERENCED
-            )
-            converted_file_extension = "md"
-        elif export_to == "html":
-            self.parsed_file = docling_document_from_file.export_to_html()
-
         new_file = FileRag(filename=file_data.filename)
         session.add(new_file)
         await session.commit()
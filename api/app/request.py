@@ -157,12 +157,12 @@ class FileRequest:
             return None
 
 
-def ask_question(question, placeholder=None):
-    """Demande une question au modèle et génère une réponse"""
+def ask_question(question, placeholder=None, file_uids: list[str] = None):
+    """Demande une question au modèle et génère une réponse, éventuellement limitée à `file_uids`"""
     try:
         response = requests.post(
             f"{config.FASTAPI_URL}/chat/",
-            json={"content": question},
+            json={"content": question, "file_uids": file_uids},
             headers={"Content-Type": "application/json"},
         )
         response.raise_for_status()  # Lève une exception pour les erreurs HTTP
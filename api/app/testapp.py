@@ -5,14 +5,47 @@ from api.app.chat.routes import llm_router
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from api.app.db.main import init_db, close_db
+from api.app.db.log_writer import chat_log_writer
+from api.app.chat.pool import model_pool
+from api.app.chat.scheduler import generation_scheduler
+from api.app.vector_db.batcher import query_batcher
+from api.app.vector_db.embedding_cache import embedding_cache
+from api.app.vector_db.embedding import EmbeddingForChunks
+from api.app.vector_db.rerank import reranker
+from api.app.vector_db.service import VectorDatabaseService
+from api.app.config import config
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()  # Appelé au démarrage
+    # Le modèle d'embedding n'est plus chargé à l'import : chargement et préchauffage ici
+    await run_in_threadpool(EmbeddingForChunks.warmup)
+    await run_in_threadpool(EmbeddingForChunks.start_pool)
+    await run_in_threadpool(reranker.warmup)
+    # La dimension de la collection dépend du modèle chargé
+    vectordb_service = VectorDatabaseService()
+    await vectordb_service.connect()  # Connexion Qdrant partagée par toutes les requêtes
+    await vectordb_service.ensure_collection()
+    vectordb_service.watch()  # Suit les bascules de l'alias faites par `reindex` / `switch`
+    await chat_log_writer.start()
+    await query_batcher.start()
+    # Chargement unique du modèle GGUF, partagé ensuite par toutes les requêtes
+    if config.LLM.WARMUP:
+        await run_in_threadpool(model_pool.warmup)
     try:
         yield
     finally:
+        await query_batcher.stop()
+        await vectordb_service.close()
+        reranker.close()
+        embedding_cache.close()
+        EmbeddingForChunks.stop_pool()
+        # Aucune instance ne doit être encore utilisée par un thread quand le pool les ferme
+        await run_in_threadpool(generation_scheduler.shutdown)
+        model_pool.close()
+        await chat_log_writer.stop()  # Insère les logs encore en file
         await close_db()
 
 
@@ -38,5 +71,16 @@ async def root():
     return {"message": "Hello Bigger Applications!"}
 
 
+@app.get("/health")
+async def health():
+    return {
+        "embedding": {"ready": EmbeddingForChunks.ready, "device": EmbeddingForChunks.device},
+        # Suivis par la ré-indexation : encodeur préchargé, puis bascule effective de l'API
+        "vector_collection": VectorDatabaseService().collection_name,
+        "vector_prepared": VectorDatabaseService().prepared,
+        "models": model_pool.stats(),
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run("testapp:app", host="127.0.0.1", port=8000, log_level="info", workers=1, reload=True)
@@ -1,15 +1,11 @@
-from api.app.config import config, EMBEDDING_MODEL
+from api.app.config import config
+from .embedding import EmbeddingForChunks
 
-def get_size_for_embedding(embedding_model: str):
-    if embedding_model == EMBEDDING_MODEL.EMBASS:
-        return 1024
-    elif embedding_model == EMBEDDING_MODEL.MINILM:
-        return 384
-    elif embedding_model == EMBEDDING_MODEL.BAAI:
-        return 1024
-    elif embedding_model == EMBEDDING_MODEL.INFLOAT:
-        return 1024
-    elif embedding_model == EMBEDDING_MODEL.MXBAI:
-        return 512
-    else:
-        return 768
+
+def get_size_for_embedding(embedding_model: str = config.EMBEDDING_MODEL):
+    """Dimension des vecteurs, lue sur le modèle chargé (troncature Matryoshka comprise)."""
+    if str(embedding_model) != EmbeddingForChunks.model_name:
+        raise ValueError(
+            f"Le modèle chargé est {EmbeddingForChunks.model_name}, pas {embedding_model}"
+        )
+    return EmbeddingForChunks.dimension
@@ -0,0 +1,155 @@
+import asyncio
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from api.app.config import config
+from .embedding import EmbeddingForChunks, EmbeddingModelManager
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+
+
+class Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def stats(self) -> Dict:
+        labels = [f"<={bucket}" for bucket in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class QueryEmbeddingBatcher:
+    """
+    Regroupe les questions arrivant en même temps en un seul appel à `encode`.
+
+    Au repos, une question est encodée immédiatement (aucune latence ajoutée).
+    Dès que le lot précédent contenait plusieurs questions (signe de charge), le batcher
+    attend jusqu'à `max_wait_ms` pour compléter le lot, dans la limite de `max_batch_size`.
+    Pendant une bascule de collection, les questions d'un même lot peuvent viser deux
+    encodeurs différents : elles sont encodées par groupe d'encodeur.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = config.EMBEDDING.QUERY_BATCH_SIZE,
+        max_wait_ms: float = config.EMBEDDING.QUERY_BATCH_WAIT_MS,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # Un seul thread : les lots passent l'un après l'autre sur le modèle
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embedding")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_batch_size = 1
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_times_ms = Histogram(WAIT_MS_BUCKETS)
+
+    @staticmethod
+    def _encode(encoder: EmbeddingModelManager, queries: List[str]) -> List[List[float]]:
+        return encoder.encode(queries, batch_size=len(queries), convert_to_numpy=True).tolist()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def encode(
+        self, query: str, encoder: EmbeddingModelManager = EmbeddingForChunks
+    ) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            # Batcher non démarré : encodage direct hors de la boucle d'évènements
+            vectors = await loop.run_in_executor(self.executor, self._encode, encoder, [query])
+            return vectors[0]
+
+        future = loop.create_future()
+        await self._queue.put((query, encoder, future, perf_counter()))
+        return await future
+
+    async def _collect(self, first) -> List:
+        batch = [first]
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        if self._last_batch_size > 1 and self.max_wait_ms > 0:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                break
+
+            batch = await self._collect(first)
+            # Le signal d'arrêt peut avoir été ramassé avec le lot
+            stopping = any(item is None for item in batch)
+            batch = [item for item in batch if item is not None]
+
+            now = perf_counter()
+            for _, _, _, queued_at in batch:
+                self.wait_times_ms.observe((now - queued_at) * 1000)
+            self.batch_sizes.observe(len(batch))
+            self._last_batch_size = len(batch)
+
+            groups: Dict[EmbeddingModelManager, List] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for encoder, group in groups.items():
+                try:
+                    vectors = await loop.run_in_executor(
+                        self.executor, self._encode, encoder, [query for query, _, _, _ in group]
+                    )
+                except Exception as e:
+                    for _, _, future, _ in group:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for (_, _, future, _), vector in zip(group, vectors):
+                        if not future.done():
+                            future.set_result(vector)
+
+            if stopping:
+                break
+
+    async def stop(self):
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+            self._queue = None
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict:
+        return {
+            "batch_size": self.batch_sizes.stats(),
+            "wait_time_ms": self.wait_times_ms.stats(),
+        }
+
+
+query_batcher = QueryEmbeddingBatcher()
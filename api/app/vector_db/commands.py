@@ -0,0 +1,105 @@
+"""
+Commandes d'administration de la collection Qdrant.
+
+Usage :
+    python -m api.app.vector_db.commands quantize
+    python -m api.app.vector_db.commands index
+    python -m api.app.vector_db.commands reindex [--no-switch] [--force] [--drop-previous]
+    python -m api.app.vector_db.commands switch <collection>
+"""
+
+import argparse
+import asyncio
+
+from api.app.db.main import init_db
+from api.app.vector_db.embedding import EmbeddingForChunks
+from api.app.vector_db.embedding_cache import embedding_cache
+from api.app.vector_db.service import VectorDatabaseService
+
+
+async def quantize(service: VectorDatabaseService, args):
+    """Applique `QDRANT.QUANTIZATION` (et `QDRANT.ON_DISK` si quantifiée) à la collection existante."""
+    await service.apply_quantization()
+
+
+async def index(service: VectorDatabaseService, args):
+    """Applique `QDRANT.HNSW_*` et crée les index de `QDRANT.PAYLOAD_INDEXES` sur la collection existante."""
+    await service.apply_index_settings()
+
+
+async def reindex(service: VectorDatabaseService, args):
+    """
+    Reconstruit l'index dans `<COLLECTION_NAME>_v<n>` avec la configuration actuelle.
+
+    L'API continue de servir l'ancienne collection, précharge l'encodeur de la nouvelle
+    (modèle, dimension, mode hybride enregistrés avec elle) et la suit après la bascule.
+    """
+    from api.app.vector_db.reindex import ReindexJob
+
+    await init_db()  # Table du schéma des collections (`vector_collections`)
+    EmbeddingForChunks.start_pool()
+    try:
+        result = await ReindexJob(service).run(
+            switch=not args.no_switch,
+            drop_previous=args.drop_previous,
+            force=args.force,
+        )
+    finally:
+        EmbeddingForChunks.stop_pool()
+        embedding_cache.close()
+    print(
+        f"Collection ré-indexée : {result['collection']} (bascule : {result['switched']}, "
+        f"échecs : {len(result['failed'])}, repris avec l'ancien découpage : {len(result['fallback'])})"
+    )
+
+
+async def switch(service: VectorDatabaseService, args):
+    """Fait pointer l'alias `QDRANT.ALIAS` vers une collection (bascule ou retour arrière)."""
+    previous = await service.switch_alias(args.collection)
+    print(f"Alias basculé : {previous} -> {args.collection}")
+
+
+async def run(args):
+    service = VectorDatabaseService()
+    await service.connect()
+    try:
+        await args.func(service, args)
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Administration de la collection Qdrant")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "quantize", help="Applique la configuration de quantification à la collection existante"
+    ).set_defaults(func=quantize)
+    subparsers.add_parser(
+        "index", help="Applique les paramètres HNSW et les index de payload à la collection existante"
+    ).set_defaults(func=index)
+
+    reindex_parser = subparsers.add_parser(
+        "reindex", help="Reconstruit l'index dans une nouvelle collection versionnée puis bascule l'alias"
+    )
+    reindex_parser.add_argument(
+        "--no-switch", action="store_true", help="Ne bascule pas l'alias (voir la commande switch)"
+    )
+    reindex_parser.add_argument(
+        "--drop-previous", action="store_true", help="Supprime l'ancienne collection après la bascule"
+    )
+    reindex_parser.add_argument(
+        "--force", action="store_true", help="Bascule malgré des fichiers en échec ou repris avec l'ancien découpage"
+    )
+    reindex_parser.set_defaults(func=reindex)
+
+    switch_parser = subparsers.add_parser("switch", help="Fait pointer l'alias vers une collection")
+    switch_parser.add_argument("collection")
+    switch_parser.set_defaults(func=switch)
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
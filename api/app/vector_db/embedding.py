@@ -0,0 +1,171 @@
+import os
+import threading
+from typing import List, Optional
+
+from api.app import logger
+from api.app.config import config
+
+
+class EmbeddingModelManager:
+    """
+    Modèle d'embedding chargé à la demande (ou pendant le lifespan FastAPI).
+
+    Importer ce module ne charge ni torch ni sentence-transformers. Le périphérique est
+    le premier disponible de `devices` (ex. ["cuda:1", "cuda:0", "cpu"]), avec repli sur
+    le CPU. `ready` passe à True après un encodage de préchauffage.
+
+    `backend` vaut "torch" ou "onnx" (modèle quantifié int8 exécuté par onnxruntime,
+    destiné aux nœuds CPU) ; en cas d'échec du backend ONNX, on revient à PyTorch.
+
+    Si `output_dim` est défini, les embeddings des modèles Matryoshka (ex. mxbai-embed-large)
+    sont tronqués à cette dimension puis renormalisés.
+    """
+
+    def __init__(
+        self,
+        model_name: str = config.EMBEDDING_MODEL,
+        devices: List[str] = config.EMBEDDING.DEVICES,
+        backend: str = config.EMBEDDING.BACKEND,
+        output_dim: Optional[int] = config.EMBEDDING.OUTPUT_DIM,
+    ):
+        self.model_name = str(model_name)
+        self.devices = devices
+        self.backend = backend
+        self.output_dim = output_dim
+        self.device: Optional[str] = None
+        self.ready = False
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+        # Le pool partage ses files d'entrée/sortie : un seul encodage à la fois, sinon
+        # deux jobs simultanés (numérotés tous deux à partir de 0) échangent leurs résultats
+        self._pool_lock = threading.Lock()
+
+    @staticmethod
+    def _select_device(devices: List[str]) -> str:
+        import torch
+
+        for device in devices:
+            if device == "cpu":
+                return device
+            if device.startswith("cuda") and torch.cuda.is_available():
+                index = int(device.split(":")[1]) if ":" in device else 0
+                if index < torch.cuda.device_count():
+                    return device
+        return "cpu"
+
+    def load(self):
+        with self._lock:
+            if self._model is not None:
+                return self._model
+
+            from sentence_transformers import SentenceTransformer
+
+            self.device = self._select_device(self.devices)
+            logger.info(
+                f"Initialisation du modèle d'embedding {self.model_name} sur {self.device} ({self.backend})"
+            )
+
+            model = None
+            if self.backend == "onnx":
+                try:
+                    from .onnx_backend import load_quantized_model
+
+                    model = load_quantized_model(self.model_name, truncate_dim=self.output_dim)
+                    self.device = "cpu"  # Modèle int8 exécuté par onnxruntime sur CPU uniquement
+                except Exception as e:
+                    # onnxruntime/optimum absents (pip install "sentence-transformers[onnx]") ou parité insuffisante
+                    logger.error(f"Backend ONNX indisponible, repli sur PyTorch : {e}")
+                    self.backend = "torch"
+
+            if model is None:
+                model = SentenceTransformer(
+                    model_name_or_path=self.model_name,
+                    device=self.device,
+                    truncate_dim=self.output_dim,
+                )
+                if config.EMBEDDING.FP16 and self.device.startswith("cuda"):
+                    model.half()
+
+            self._model = model
+            return model
+
+    @property
+    def cache_key(self) -> str:
+        """Identifie les embeddings produits (modèle + backend) pour le cache persistant."""
+        self.model  # Le backend effectif n'est connu qu'après chargement (repli éventuel)
+        return f"{self.model_name}:{self.backend}:{self.dimension}"
+
+    @property
+    def dimension(self) -> int:
+        """Dimension des embeddings produits, après troncature éventuelle."""
+        return self.model.get_sentence_embedding_dimension()
+
+    @property
+    def model(self):
+        return self._model if self._model is not None else self.load()
+
+    def warmup(self):
+        """Charge le modèle et effectue un premier encodage."""
+        self.model.encode(["warmup"])
+        self.ready = True
+
+    def encode(self, *args, **kwargs):
+        # Un embedding tronqué n'est plus unitaire : on le renormalise
+        if self.output_dim is not None:
+            kwargs.setdefault("normalize_embeddings", True)
+        return self.model.encode(*args, **kwargs)
+
+    def start_pool(self, processes: int = config.EMBEDDING.PROCESSES):
+        """
+        Démarre `processes` processus d'encodage CPU, chacun avec sa copie du modèle.
+
+        Réservé aux nœuds CPU : sur GPU, un seul processus sature déjà le périphérique.
+        """
+        if processes <= 1 or self._pool is not None:
+            return
+        self.load()
+        if self.device != "cpu":
+            logger.info("Pool multi-processus ignoré : le modèle d'embedding tourne sur GPU")
+            return
+
+        # Répartit les cœurs entre les processus pour éviter la sur-souscription des threads torch
+        threads = str(max(1, (os.cpu_count() or 1) // processes))
+        previous = os.environ.get("OMP_NUM_THREADS")
+        os.environ["OMP_NUM_THREADS"] = threads
+        try:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        finally:
+            if previous is None:
+                del os.environ["OMP_NUM_THREADS"]
+            else:
+                os.environ["OMP_NUM_THREADS"] = previous
+
+        logger.info(f"Pool d'encodage démarré : {processes} processus x {threads} threads")
+
+    def stop_pool(self):
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def encode_large(self, texts: List[str], batch_size: int = config.EMBEDDING.BATCH_SIZE):
+        """Encode un grand nombre de textes, réparti sur le pool multi-processus au-delà du seuil."""
+        if self._pool is not None and len(texts) >= config.EMBEDDING.MULTIPROCESS_THRESHOLD:
+            with self._pool_lock:
+                return self.model.encode_multi_process(
+                    texts,
+                    self._pool,
+                    batch_size=batch_size,
+                    normalize_embeddings=self.output_dim is not None,
+                )
+        return self.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+    def empty_cache(self):
+        """Libère le cache CUDA si le modèle tourne sur GPU."""
+        if self.device is not None and self.device.startswith("cuda"):
+            import torch
+
+            torch.cuda.empty_cache()
+
+
+EmbeddingForChunks = EmbeddingModelManager()
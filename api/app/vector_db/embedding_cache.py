@@ -0,0 +1,122 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from time import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.app.config import config
+
+# Limite prudente du nombre de paramètres par requête SQLite
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Cache persistant des embeddings de chunks, stocké dans un fichier SQLite.
+
+    Les entrées sont indexées par (nom du modèle d'embedding, sha256 du texte) :
+    un chunk dont le texte n'a pas changé n'est jamais ré-encodé. Le cache est borné
+    à `max_entries` ; les entrées les moins récemment lues sont supprimées en premier.
+    """
+
+    def __init__(
+        self,
+        path: Path = config.EMBEDDING.CACHE_PATH,
+        max_entries: int = config.EMBEDDING.CACHE_MAX_ENTRIES,
+        enabled: bool = config.EMBEDDING.CACHE_ENABLED,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, hash)
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Retourne les embeddings déjà connus parmi `hashes`."""
+        if not self.enabled or not hashes:
+            return {}
+
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            unique = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique), _SQL_BATCH):
+                batch = unique[i : i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+                connection.execute(
+                    f"UPDATE embeddings SET last_access = ? WHERE model = ? AND hash IN ({placeholders})",
+                    [time(), model, *batch],
+                )
+            connection.commit()
+
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        """Enregistre de nouveaux embeddings puis applique la limite de taille."""
+        if not self.enabled or not vectors:
+            return
+
+        now = time()
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                [
+                    (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for text_hash, vector in vectors.items()
+                ],
+            )
+
+            (count,) = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                connection.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+embedding_cache = EmbeddingCache()
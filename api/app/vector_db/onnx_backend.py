@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from api.app import logger
+from api.app.config import config
+
+# Phrases de contrôle pour comparer les embeddings ONNX int8 à ceux de PyTorch
+PARITY_SENTENCES = [
+    "Quelle est la posologie recommandée chez l'adulte ?",
+    "Les effets indésirables les plus fréquents sont les nausées et les céphalées.",
+    "What is the maximum daily dose of paracetamol?",
+    "Le traitement doit être interrompu en cas de réaction allergique.",
+    "Contre-indications : insuffisance hépatique sévère, grossesse.",
+    "Store below 25°C in the original package.",
+]
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    return config.EMBEDDING.ONNX_FOLDER / model_name.replace("/", "__")
+
+
+def onnx_file_name(quantization: str = config.EMBEDDING.ONNX_QUANTIZATION) -> str:
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def parity(reference, candidate, sentences: List[str] = PARITY_SENTENCES) -> float:
+    """Similarité cosinus minimale entre les embeddings des deux modèles pour les mêmes phrases."""
+    expected = reference.encode(sentences, normalize_embeddings=True)
+    actual = candidate.encode(sentences, normalize_embeddings=True)
+    return float(np.min(np.sum(expected * actual, axis=1)))
+
+
+def measure_parity(model_name: str, save_dir: Path, quantization: str = config.EMBEDDING.ONNX_QUANTIZATION) -> float:
+    """Compare le modèle int8 exporté à PyTorch et enregistre le résultat dans `parity.json`."""
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_name, device="cpu")
+    quantized = SentenceTransformer(
+        str(save_dir),
+        backend="onnx",
+        device="cpu",
+        model_kwargs={"file_name": onnx_file_name(quantization)},
+    )
+    score = parity(reference, quantized)
+    (save_dir / "parity.json").write_text(json.dumps({"quantization": quantization, "min_cosine": score}))
+    logger.info(f"Parité ONNX int8 / PyTorch : similarité cosinus minimale {score:.4f}")
+    return score
+
+
+def export_quantized_model(model_name: str, quantization: str = config.EMBEDDING.ONNX_QUANTIZATION) -> Path:
+    """
+    Exporte le modèle en ONNX puis applique une quantification dynamique int8.
+
+    L'artefact est conservé sur disque (`EMBEDDING.ONNX_FOLDER`) : l'export n'a lieu
+    qu'une fois par modèle. La parité avec PyTorch est mesurée à l'export et enregistrée
+    dans `parity.json` à côté du modèle.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    save_dir = onnx_model_dir(model_name)
+    if (save_dir / onnx_file_name(quantization)).exists():
+        return save_dir
+
+    logger.info(f"Export ONNX int8 ({quantization}) du modèle {model_name} vers {save_dir}")
+    onnx_model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+    onnx_model.save_pretrained(str(save_dir))
+    export_dynamic_quantized_onnx_model(
+        onnx_model, quantization_config=quantization, model_name_or_path=str(save_dir)
+    )
+    measure_parity(model_name, save_dir, quantization)
+
+    return save_dir
+
+
+def load_quantized_model(model_name: str, **kwargs):
+    """
+    Charge le modèle ONNX int8 (exporté au besoin) exécuté par onnxruntime sur CPU.
+
+    La quantification cible les jeux d'instructions CPU (avx2, arm64) : le modèle n'est
+    jamais placé sur GPU. Lève une ValueError si la parité mesurée est sous
+    `EMBEDDING.ONNX_PARITY_THRESHOLD`.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    quantization = config.EMBEDDING.ONNX_QUANTIZATION
+    save_dir = export_quantized_model(model_name, quantization)
+
+    parity_file = save_dir / "parity.json"
+    if parity_file.exists():
+        score = json.loads(parity_file.read_text())["min_cosine"]
+    else:
+        # Export interrompu avant la mesure : on ne charge pas un modèle non vérifié
+        score = measure_parity(model_name, save_dir, quantization)
+    if score < config.EMBEDDING.ONNX_PARITY_THRESHOLD:
+        raise ValueError(
+            f"Parité ONNX insuffisante pour {model_name} : {score:.4f} "
+            f"< {config.EMBEDDING.ONNX_PARITY_THRESHOLD}"
+        )
+
+    return SentenceTransformer(
+        str(save_dir),
+        backend="onnx",
+        device="cpu",
+        model_kwargs={"file_name": onnx_file_name(quantization)},
+        **kwargs,
+    )
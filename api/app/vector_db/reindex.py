@@ -0,0 +1,298 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Dict, List, Optional
+
+import requests
+from qdrant_client import models
+from sqlmodel import select
+
+from api.app import logger
+from api.app.config import config
+from api.app.db.main import async_session
+from api.app.db.models import FileRag
+from api.app.vector_db.schemas import ChunkCreateModel, FileForChunkModel
+from api.app.vector_db.service import ChunkService, VectorDatabaseService
+
+
+class ReindexError(Exception):
+    pass
+
+
+class ReindexJob:
+    """
+    Reconstruit l'index dans une nouvelle collection versionnée, puis bascule l'alias.
+
+    Chaque fichier de la table `files` est reconverti depuis sa source (`PDF_FOLDER`), redécoupé
+    et ré-encodé avec la configuration actuelle, par lots de `batch_files`. Pendant ce temps,
+    l'API continue de servir l'ancienne collection via l'alias `QDRANT.ALIAS`.
+
+    Le schéma des vecteurs (modèle, dimension, mode hybride) est enregistré avec la nouvelle
+    collection : l'API en cours d'exécution précharge l'encodeur correspondant et change
+    d'encodeur en même temps que de collection. Un changement d'`EMBEDDING_MODEL`, d'`OUTPUT_DIM`
+    ou de `HYBRID` se déploie donc sans arrêt de l'API.
+
+    La progression est enregistrée après chaque lot dans `state_path` : relancer la commande
+    reprend le job là où il s'était arrêté. Avant la bascule, une passe de rattrapage traite
+    les fichiers ajoutés et retire ceux supprimés pendant la ré-indexation ; une dernière passe
+    suit le passage effectif de l'API sur la nouvelle collection.
+
+    La bascule est refusée (sauf `force`) si des fichiers ont échoué ou n'ont pu être repris
+    qu'avec les anciens chunks.
+    """
+
+    def __init__(
+        self,
+        service: VectorDatabaseService,
+        batch_files: int = config.REINDEX.BATCH_FILES,
+        workers: int = config.REINDEX.WORKERS,
+        state_path: Path = config.REINDEX.STATE_PATH,
+    ):
+        self.service = service
+        self.batch_files = batch_files
+        self.workers = workers
+        self.state_path = Path(state_path)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reindex")
+        # Un convertisseur Docling par thread : on ne partage pas le pipeline entre conversions
+        self._local = threading.local()
+        self.state: Dict = {}
+
+    def _load_state(self) -> Optional[Dict]:
+        if self.state_path.exists():
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        return None
+
+    def _save_state(self):
+        self.state_path.write_text(json.dumps(self.state), encoding="utf-8")
+
+    def _file_service(self):
+        if not hasattr(self._local, "file_service"):
+            from api.app.files.service import FileService
+
+            self._local.file_service = FileService()
+        return self._local.file_service
+
+    def _chunks_from_source(self, file: FileRag) -> List[ChunkCreateModel]:
+        """Reconvertit et redécoupe un fichier de `PDF_FOLDER` (exécuté dans un thread)."""
+        path = config.PDF_FOLDER / file.filename
+        text = self._file_service().convert(file.filename, path.read_bytes())
+        chunk_service = ChunkService()
+        chunk_service.create_chunks_from_text(
+            file_for_chunk_data=FileForChunkModel(
+                str_file_content=text,
+                dict_file_metadata={"filename": str(file.uid)},
+            )
+        )
+        return chunk_service.chunks
+
+    async def _chunks_from_collection(self, collection_name: str, file_uid: str) -> List[ChunkCreateModel]:
+        """Chunks d'un fichier tels qu'enregistrés dans l'ancienne collection, à ré-encoder."""
+        chunks = []
+        offset = None
+        while True:
+            points, offset = await self.service.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="metadata.filename", match=models.MatchValue(value=file_uid)
+                        )
+                    ]
+                ),
+                limit=256,
+                offset=offset,
+                with_payload=True,
+            )
+            chunks.extend(
+                ChunkCreateModel(content=point.payload["content"], metadata=point.payload["metadata"])
+                for point in points
+            )
+            if offset is None:
+                return chunks
+
+    async def _file_chunks(self, file: FileRag) -> List[ChunkCreateModel]:
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._chunks_from_source, file)
+        except Exception as e:
+            if self.state["previous"] is None:
+                raise
+            # Source absente ou illisible : les chunks existants sont ré-encodés tels quels,
+            # avec l'ancien découpage (signalé dans le résultat, bloque la bascule sans `force`)
+            logger.warning(f"{file.filename} : {e} ; chunks repris de {self.state['previous']}")
+            chunks = await self._chunks_from_collection(self.state["previous"], str(file.uid))
+            self.state["fallback"][str(file.uid)] = str(e)
+            return chunks
+
+    async def _reindex_files(self, files: List[FileRag]):
+        collection_name = self.state["collection"]
+        todo = [file for file in files if str(file.uid) not in self.state["done"]]
+        total = len(self.state["done"]) + len(todo)
+
+        for i in range(0, len(todo), self.batch_files):
+            batch = todo[i : i + self.batch_files]
+            start = perf_counter()
+
+            # Conversions Docling en parallèle ; l'encodage est groupé sur tout le lot
+            results = await asyncio.gather(*(self._file_chunks(file) for file in batch), return_exceptions=True)
+            chunks = []
+            done = []
+            for file, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Ré-indexation de {file.filename} impossible : {result}")
+                    self.state["failed"][str(file.uid)] = str(result)
+                    continue
+                # Reprise : les points d'un lot interrompu sont remplacés, pas dupliqués
+                await self.service.delete_vectors(
+                    key="metadata.filename", value=str(file.uid), collection_name=collection_name
+                )
+                chunks.extend(result)
+                done.append(str(file.uid))
+                self.state["failed"].pop(str(file.uid), None)
+
+            await self.service.create_vectors(
+                chunks=chunks, target=self.service.local_target(collection_name)
+            )
+
+            self.state["done"].extend(done)
+            self._save_state()
+            logger.info(
+                f"Ré-indexation : {len(self.state['done'])}/{total} fichiers "
+                f"({len(chunks)} chunks en {perf_counter() - start:.1f}s)"
+            )
+
+    @staticmethod
+    async def _list_files() -> List[FileRag]:
+        async with async_session() as session:
+            return list((await session.exec(select(FileRag))).all())
+
+    async def _remove_deleted(self, files: List[FileRag]):
+        """Retire de la nouvelle collection les fichiers supprimés pendant la ré-indexation."""
+        existing = {str(file.uid) for file in files}
+        for file_uid in [uid for uid in self.state["done"] if uid not in existing]:
+            await self.service.delete_vectors(
+                key="metadata.filename", value=file_uid, collection_name=self.state["collection"]
+            )
+            self.state["done"].remove(file_uid)
+            self.state["fallback"].pop(file_uid, None)
+        for file_uid in [uid for uid in self.state["failed"] if uid not in existing]:
+            del self.state["failed"][file_uid]
+        self._save_state()
+
+    async def _wait_for_api(self, collection_name: str, *fields: str) -> bool:
+        """
+        Attend que l'un des `fields` de `/health` de l'API en cours d'exécution vaille
+        `collection_name` (True si l'API est arrêtée, False après `REINDEX.API_WAIT_TIMEOUT`).
+        """
+        deadline = monotonic() + config.REINDEX.API_WAIT_TIMEOUT
+        while monotonic() < deadline:
+            try:
+                response = await asyncio.to_thread(
+                    requests.get, f"{config.FASTAPI_URL}/health", timeout=5
+                )
+                response.raise_for_status()
+            except requests.ConnectionError:
+                return True
+            except requests.RequestException as e:
+                logger.warning(f"État de l'API inconnu : {e}")
+            else:
+                health = response.json()
+                if any(health.get(field) == collection_name for field in fields):
+                    return True
+            await asyncio.sleep(1)
+        return False
+
+    async def _catch_up(self):
+        """Rattrapage : fichiers ajoutés ou supprimés via l'API pendant la ré-indexation."""
+        files = await self._list_files()
+        await self._reindex_files(files)
+        await self._remove_deleted(files)
+
+    async def run(
+        self,
+        switch: bool = True,
+        drop_previous: bool = False,
+        force: bool = False,
+    ) -> Dict:
+        """
+        Exécute (ou reprend) la ré-indexation.
+
+        Retourne la nouvelle collection, si l'alias a basculé, et les fichiers en échec (`failed`)
+        ou repris avec les anciens chunks (`fallback`).
+        """
+        state = self._load_state()
+        if state is not None and await self.service.client.collection_exists(state["collection"]):
+            logger.info(f"Reprise de la ré-indexation vers {state['collection']}")
+            self.state = state
+            self.state.setdefault("fallback", {})
+        else:
+            collection_name = await self.service.next_collection_name()
+            await self.service.create_collection(collection_name)
+            self.state = {
+                "collection": collection_name,
+                "previous": await self.service.resolve_collection(),
+                "done": [],
+                "failed": {},
+                "fallback": {},
+            }
+            self._save_state()
+            logger.info(f"Ré-indexation vers la nouvelle collection {collection_name}")
+
+        try:
+            await self._reindex_files(await self._list_files())
+            await self._catch_up()
+            return await self._switch(switch, drop_previous, force)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def _switch(self, switch: bool, drop_previous: bool, force: bool) -> Dict:
+        collection_name = self.state["collection"]
+        result = {
+            "collection": collection_name,
+            "switched": False,
+            "failed": dict(self.state["failed"]),
+            "fallback": dict(self.state["fallback"]),
+        }
+        if self.state["failed"]:
+            logger.warning(f"{len(self.state['failed'])} fichier(s) non ré-indexé(s) : {self.state['failed']}")
+        if self.state["fallback"]:
+            logger.warning(
+                f"{len(self.state['fallback'])} fichier(s) repris avec l'ancien découpage : "
+                f"{self.state['fallback']}"
+            )
+
+        if not switch:
+            return result
+        if (self.state["failed"] or self.state["fallback"]) and not force:
+            raise ReindexError(
+                f"Bascule refusée : {len(self.state['failed'])} fichier(s) en échec, "
+                f"{len(self.state['fallback'])} repris avec l'ancien découpage (--force pour basculer)"
+            )
+
+        # L'API charge l'encodeur de la nouvelle collection dès sa création : on attend qu'il
+        # soit prêt pour qu'elle bascule aussitôt. Sinon, elle le charge après la bascule en
+        # continuant de servir l'ancienne collection avec l'ancien encodeur.
+        if not await self._wait_for_api(collection_name, "vector_prepared", "vector_collection"):
+            logger.warning(f"Encodeur de {collection_name} pas encore chargé par l'API")
+
+        await self.service.switch_alias(collection_name)
+        result["switched"] = True
+
+        # L'API suit l'alias toutes les `QDRANT.ALIAS_REFRESH_S` ; d'ici là, ses ajouts vont
+        # encore dans l'ancienne collection : dernier rattrapage une fois qu'elle a basculé
+        if not await self._wait_for_api(collection_name, "vector_collection"):
+            raise ReindexError(
+                f"Alias basculé vers {collection_name}, mais l'API sert encore l'ancienne collection : "
+                f"relancer `reindex` pour le dernier rattrapage"
+            )
+        await self._catch_up()
+
+        previous = self.state["previous"]
+        if drop_previous and previous not in (None, collection_name):
+            await self.service.client.delete_collection(collection_name=previous)
+            logger.info(f"Ancienne collection {previous} supprimée")
+        self.state_path.unlink(missing_ok=True)
+        return result
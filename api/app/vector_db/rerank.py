@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from api.app import logger
+from api.app.config import config
+from api.app.vector_db.batcher import Histogram
+from api.app.vector_db.embedding import EmbeddingModelManager
+
+
+class CrossEncoderReranker:
+    """
+    Reclassement des chunks candidats par un cross-encoder local.
+
+    `search_best_chunks` sur-échantillonne (`RERANK.CANDIDATES`) ; les paires (question, chunk)
+    sont notées en une seule passe groupée, puis les `k` meilleurs chunks sont conservés.
+    Les scores sont mis en cache par (hash de la question, id du point). Si la notation dépasse
+    `RERANK.LATENCY_BUDGET_MS`, on garde l'ordre de la recherche vectorielle.
+    """
+
+    def __init__(
+        self,
+        model_name: str = config.RERANK.MODEL,
+        devices: List[str] = config.RERANK.DEVICES,
+        enabled: bool = config.RERANK.ENABLED,
+        batch_size: int = config.RERANK.BATCH_SIZE,
+        latency_budget_ms: float = config.RERANK.LATENCY_BUDGET_MS,
+        cache_size: int = config.RERANK.CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.devices = devices
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.cache_size = cache_size
+        self.device: Optional[str] = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+        # Un seul thread : les lots passent l'un après l'autre sur le modèle
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.latency = Histogram([10, 25, 50, 100, 250, 500, 1000])
+        self.fallbacks = 0
+        self.cache_hits = 0
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                self.device = EmbeddingModelManager._select_device(self.devices)
+                logger.info(f"Initialisation du cross-encoder {self.model_name} sur {self.device}")
+                self._model = CrossEncoder(self.model_name, device=self.device)
+            return self._model
+
+    def warmup(self):
+        if self.enabled:
+            self.load().predict([("warmup", "warmup")])
+
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def _score(self, query: str, documents: List[Dict], deadline: float) -> Optional[List[float]]:
+        """
+        Scores des paires (question, chunk) ; seules les paires absentes du cache sont calculées.
+
+        Retourne None sans calculer si `deadline` est dépassée pendant l'attente dans la file :
+        la requête a déjà abandonné, inutile d'occuper le modèle pour elle.
+        """
+        if monotonic() > deadline:
+            return None
+
+        query_hash = self._query_hash(query)
+        keys = [(query_hash, doc.get("id")) for doc in documents]
+        scores = {}
+        missing = []
+        for key, doc in zip(keys, documents):
+            if key[1] is not None and key in self._cache:
+                self._cache.move_to_end(key)
+                scores[key] = self._cache[key]
+                self.cache_hits += 1
+            else:
+                missing.append((key, doc))
+
+        if missing:
+            predicted = self.load().predict(
+                [(query, doc["content"]) for _, doc in missing],
+                batch_size=self.batch_size,
+            )
+            for (key, _), score in zip(missing, predicted):
+                scores[key] = float(score)
+                if key[1] is not None:
+                    self._cache[key] = float(score)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return [scores[key] for key in keys]
+
+    async def rerank(
+        self, query: str, documents: List[Dict], k: int = int(config.NUMBER_BEST_CHUNKS)
+    ) -> Tuple[List[Dict], Optional[float]]:
+        """Retourne les `k` meilleurs chunks et le temps de reclassement en ms (None si désactivé)."""
+        k = int(k)
+        if not self.enabled or not documents:
+            return documents[:k], None
+
+        start = perf_counter()
+        loop = asyncio.get_running_loop()
+        deadline = monotonic() + self.latency_budget_ms / 1000
+        try:
+            scores = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._score, query, documents, deadline),
+                timeout=self.latency_budget_ms / 1000,
+            )
+        except asyncio.TimeoutError:
+            # Un lot déjà commencé se termine et alimente le cache ; un lot encore en file est ignoré
+            scores = None
+
+        if scores is None:
+            self.fallbacks += 1
+            logger.info(f"Reclassement hors budget ({self.latency_budget_ms} ms) : ordre vectoriel conservé")
+            reranked = documents[:k]
+        else:
+            ranked = sorted(zip(scores, documents), key=lambda item: item[0], reverse=True)
+            reranked = [
+                {**doc, "vector_score": doc.get("score"), "score": score} for score, doc in ranked[:k]
+            ]
+
+        elapsed_ms = (perf_counter() - start) * 1000
+        self.latency.observe(elapsed_ms)
+        return reranked, elapsed_ms
+
+    @property
+    def candidates(self) -> int:
+        """Nombre de chunks à demander à la recherche vectorielle."""
+        return int(config.RERANK.CANDIDATES if self.enabled else config.NUMBER_BEST_CHUNKS)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "latency_ms": self.latency.stats(),
+            "fallbacks": self.fallbacks,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._cache),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+reranker = CrossEncoderReranker()
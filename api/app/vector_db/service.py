@@ -1,25 +1,57 @@
+import asyncio
 import re
-from typing import Dict, List, Optional
-from qdrant_client import QdrantClient, models
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
-import torch
 from api.app.config import config
-from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from uuid import uuid4
 import logging
+from sqlmodel import desc, select
 
 from api.app.vector_db.schemas import ChunkCreateModel, FileForChunkModel
+from api.app.vector_db.embedding_cache import embedding_cache
+from api.app.db.main import async_session
+from api.app.db.models import VectorCollection
+from api.app.vector_db.embedding import EmbeddingForChunks, EmbeddingModelManager
+from api.app.vector_db.batcher import Histogram
+from api.app.vector_db.sparse import sparse_encoder
+import numpy as np
+from starlette.concurrency import run_in_threadpool
 from . import get_size_for_embedding
 
 logging.basicConfig(level=logging.INFO)
 
-print("Initialisation du modèle d'embedding...", config.EMBEDDING_MODEL)
-with torch.cuda.device(1):
-    EmbeddingForChunks = SentenceTransformer(
-        model_name_or_path=config.EMBEDDING_MODEL, device="cuda:1" if torch.cuda.is_available() else "cpu"
-    )
+# Noms des vecteurs de la collection en mode hybride (QDRANT.HYBRID)
+DENSE_VECTOR = "dense"
+SPARSE_VECTOR = "sparse"
+
+SEARCH_LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+
+
+def create_client(backend: str = config.QDRANT.BACKEND) -> AsyncQdrantClient:
+    """
+    Client Qdrant selon le backend choisi.
+
+    - "server" : serveur Qdrant à `QDRANT_URL` (docker-compose), REST ou gRPC ;
+    - "local" : Qdrant embarqué dans le processus (dossier `QDRANT.LOCAL_PATH`, ou en mémoire).
+      Même API et mêmes résultats, recherche exacte sans HNSW ni quantification ;
+      destiné aux tests et aux petites installations mono-processus.
+    """
+    if backend == "local":
+        if config.QDRANT.LOCAL_PATH is None:
+            return AsyncQdrantClient(location=":memory:")
+        return AsyncQdrantClient(path=str(config.QDRANT.LOCAL_PATH))
+    if backend == "server":
+        return AsyncQdrantClient(
+            url=config.QDRANT_URL,
+            prefer_grpc=config.QDRANT.PREFER_GRPC,
+            grpc_port=config.QDRANT.GRPC_PORT,
+            timeout=config.QDRANT.TIMEOUT,
+        )
+    raise ValueError(f"Backend Qdrant inconnu : {backend} (attendu : 'server' ou 'local')")
 
 
 class ChunkService:
@@ -209,6 +241,7 @@ class ChunkService:
         chunk_overlap: int = config.CHUNKS.OVERLAP,
     ) -> None:
         """Divise un fichier Markdown en chunks avec gestion des titres et sous-titres."""
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
 
         content = file_for_chunk_data.str_file_content.strip()
         self.chunks = []
@@ -268,6 +301,14 @@ class ChunkService:
                         )
 
 
+class VectorTarget(NamedTuple):
+    """Collection interrogée et encodeur produisant des vecteurs de son schéma."""
+
+    collection_name: str
+    encoder: EmbeddingModelManager
+    hybrid: bool
+
+
 class VectorDatabaseService:
     _instance = None
 
@@ -279,79 +320,569 @@ class VectorDatabaseService:
     def __init__(self):
         if not hasattr(self, "initialized"):
             self.initialized = True
-            # self.client = QdrantClient(host=QDRANT.HOST, port=QDRANT.PORT)
-            self.client = QdrantClient(url=config.QDRANT_URL)
+            # Connexion partagée, ouverte dans le lifespan FastAPI (`connect`)
+            self.client: Optional[AsyncQdrantClient] = None
+            self.backend = config.QDRANT.BACKEND
+            self.search_latency = Histogram(SEARCH_LATENCY_BUCKETS)
+            # Collection servie par l'API (cible de l'alias) et son encodeur, suivis par `watch`
+            self.target: Optional[VectorTarget] = None
+            # Collection plus récente dont l'encodeur est déjà chargé (ré-indexation en cours)
+            self.prepared: Optional[str] = None
+            self._encoders: Dict[Tuple[str, Optional[int]], EmbeddingModelManager] = {
+                (EmbeddingForChunks.model_name, EmbeddingForChunks.output_dim): EmbeddingForChunks
+            }
+            self._watch_task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        """Ouvre la connexion partagée à Qdrant selon `QDRANT.BACKEND`."""
+        if self.client is None:
+            self.client = create_client(self.backend)
+            print("Modèle initialisé avec succès. -> (vectordb)")
+        return self.client
+
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    @staticmethod
+    def _dense_vector_name() -> str:
+        # Le vecteur unique (non nommé) d'une collection dense s'appelle ""
+        return DENSE_VECTOR if config.QDRANT.HYBRID else ""
+
+    @staticmethod
+    def _on_disk() -> bool:
+        # Sans copie quantifiée en RAM, des vecteurs sur disque ralentiraient chaque recherche
+        return config.QDRANT.ON_DISK and config.QDRANT.QUANTIZATION != "none"
+
+    @classmethod
+    def _vectors_config(cls, size: int):
+        params = VectorParams(size=size, distance=Distance.COSINE, on_disk=cls._on_disk())
+        if config.QDRANT.HYBRID:
+            return {DENSE_VECTOR: params}
+        return params
+
+    @classmethod
+    def _sparse_vectors_config(cls):
+        if not config.QDRANT.HYBRID:
+            return None
+        return {
+            SPARSE_VECTOR: models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=cls._on_disk()),
+                modifier=models.Modifier.IDF,
+            )
+        }
+
+    @staticmethod
+    def _quantization_config():
+        """Configuration de quantification de la collection selon `QDRANT.QUANTIZATION`."""
+        if config.QDRANT.QUANTIZATION == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=config.QDRANT.QUANTILE,
+                    always_ram=config.QDRANT.ALWAYS_RAM,
+                )
+            )
+        if config.QDRANT.QUANTIZATION == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=config.QDRANT.ALWAYS_RAM)
+            )
+        return None
 
-            if not self.client.collection_exists(
-                collection_name=config.COLLECTION_NAME
-            ):
-                self.client.create_collection(
-                    collection_name=config.COLLECTION_NAME,
-                    vectors_config=VectorParams(
-                        size=get_size_for_embedding(config.EMBEDDING_MODEL),
-                        distance=Distance.COSINE,
-                    ),
+    @staticmethod
+    def _hnsw_config() -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(
+            m=config.QDRANT.HNSW_M,
+            ef_construct=config.QDRANT.HNSW_EF_CONSTRUCT,
+        )
+
+    @staticmethod
+    def _search_params(hnsw_ef: Optional[int] = None) -> Optional[models.SearchParams]:
+        """Paramètres de recherche : `hnsw_ef` (surcharge par requête) et rescoring quantifié."""
+        hnsw_ef = hnsw_ef or config.QDRANT.HNSW_EF
+        quantization = None
+        if config.QDRANT.QUANTIZATION != "none":
+            quantization = models.QuantizationSearchParams(
+                rescore=config.QDRANT.RESCORE,
+                oversampling=config.QDRANT.OVERSAMPLING,
+            )
+        if hnsw_ef is None and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+    @staticmethod
+    def _query_filter(
+        file_uids: Optional[List[str]] = None, metadata: Optional[Dict] = None
+    ) -> Optional[models.Filter]:
+        """Filtre Qdrant sur les fichiers (`metadata.filename`) et les autres métadonnées."""
+        conditions = []
+        if file_uids:
+            conditions.append(
+                models.FieldCondition(key="metadata.filename", match=models.MatchAny(any=file_uids))
+            )
+        for key, value in (metadata or {}).items():
+            match = (
+                models.MatchAny(any=value) if isinstance(value, list) else models.MatchValue(value=value)
+            )
+            conditions.append(models.FieldCondition(key=f"metadata.{key}", match=match))
+        return models.Filter(must=conditions) if conditions else None
+
+    async def ensure_payload_indexes(self, collection_name: str):
+        """Crée les index "keyword" manquants sur les champs de `QDRANT.PAYLOAD_INDEXES`."""
+        existing = (await self.client.get_collection(collection_name=collection_name)).payload_schema
+        for field_name in config.QDRANT.PAYLOAD_INDEXES:
+            if field_name in existing:
+                continue
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+            logging.info(f"Index de payload créé sur {field_name} ({collection_name}).")
+
+    @staticmethod
+    def alias_name() -> str:
+        return config.QDRANT.ALIAS or f"{config.COLLECTION_NAME}_live"
+
+    async def _alias_target(self) -> Optional[str]:
+        for alias in (await self.client.get_aliases()).aliases:
+            if alias.alias_name == self.alias_name():
+                return alias.collection_name
+        return None
+
+    async def resolve_collection(self) -> Optional[str]:
+        """
+        Collection servie : cible de l'alias `QDRANT.ALIAS`, vers une collection versionnée.
+
+        Une installation antérieure n'a pas encore d'alias : sa collection historique
+        `COLLECTION_NAME` reste servie jusqu'à la première bascule.
+        """
+        collection_name = await self._alias_target()
+        if collection_name is not None:
+            return collection_name
+        if await self.client.collection_exists(collection_name=config.COLLECTION_NAME):
+            return config.COLLECTION_NAME
+        return None
+
+    @property
+    def collection_name(self) -> Optional[str]:
+        return self.target.collection_name if self.target is not None else None
+
+    @staticmethod
+    async def _register_collection(collection_name: str):
+        """Enregistre le schéma des vecteurs produits par ce processus pour `collection_name`."""
+        async with async_session() as session:
+            # Un nom de version peut être réutilisé après suppression de la collection
+            await session.merge(
+                VectorCollection(
+                    name=collection_name,
+                    embedding_model=EmbeddingForChunks.model_name,
+                    output_dim=EmbeddingForChunks.output_dim,
+                    hybrid=config.QDRANT.HYBRID,
+                    created_at=datetime.now(),
                 )
+            )
+            await session.commit()
+
+    @staticmethod
+    async def _collection_schema(collection_name: str) -> Optional[VectorCollection]:
+        async with async_session() as session:
+            return await session.get(VectorCollection, collection_name)
+
+    @staticmethod
+    async def _latest_collection() -> Optional[VectorCollection]:
+        async with async_session() as session:
+            statement = select(VectorCollection).order_by(desc(VectorCollection.created_at))
+            return (await session.exec(statement)).first()
+
+    async def _encoder(self, schema: Optional[VectorCollection]) -> EmbeddingModelManager:
+        """Encodeur du schéma (chargé et préchauffé au besoin) ; configuration actuelle si inconnu."""
+        if schema is None:
+            return EmbeddingForChunks
+        key = (schema.embedding_model, schema.output_dim)
+        if key not in self._encoders:
+            encoder = EmbeddingModelManager(
+                model_name=schema.embedding_model, output_dim=schema.output_dim
+            )
+            # Chargement hors de la boucle d'évènements : la collection actuelle reste servie
+            await run_in_threadpool(encoder.warmup)
+            self._encoders[key] = encoder
+        return self._encoders[key]
+
+    def local_target(self, collection_name: str) -> VectorTarget:
+        """Collection alimentée avec la configuration de ce processus (ré-indexation)."""
+        return VectorTarget(collection_name, EmbeddingForChunks, config.QDRANT.HYBRID)
+
+    async def _target(self, collection_name: str) -> VectorTarget:
+        schema = await self._collection_schema(collection_name)
+        # Collection historique, antérieure au registre : configuration actuelle
+        hybrid = schema.hybrid if schema is not None else config.QDRANT.HYBRID
+        return VectorTarget(collection_name, await self._encoder(schema), hybrid)
+
+    async def refresh_target(self):
+        """
+        Suit la cible de l'alias, basculée par un autre processus (`reindex`, `switch`).
 
-            print("Modèle initialisé avec succès. -> (vectordb)")
+        L'encodeur d'une collection enregistrée plus récente que celle servie est chargé
+        dès sa création : à la bascule, la collection et l'encodeur des questions changent
+        ensemble, sans interruption. Les encodeurs devenus inutiles sont libérés.
+        """
+        collection_name = await self.resolve_collection()
+        if collection_name is not None and collection_name != self.collection_name:
+            target = await self._target(collection_name)
+            logging.info(
+                f"Collection servie : {self.collection_name} -> {collection_name} "
+                f"({target.encoder.model_name}, {'hybride' if target.hybrid else 'dense'})."
+            )
+            self.target = target
+        if self.target is None:
+            return
+
+        self.prepared = None
+        keep = {id(EmbeddingForChunks), id(self.target.encoder)}
+        latest = await self._latest_collection()
+        current = await self._collection_schema(self.collection_name)
+        if (
+            latest is not None
+            and latest.name != self.collection_name
+            and (current is None or latest.created_at > current.created_at)
+            and await self.client.collection_exists(collection_name=latest.name)
+        ):
+            keep.add(id(await self._encoder(latest)))
+            self.prepared = latest.name
+
+        for key, encoder in list(self._encoders.items()):
+            if id(encoder) not in keep:
+                del self._encoders[key]
+                encoder.empty_cache()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(config.QDRANT.ALIAS_REFRESH_S)
+            try:
+                await self.refresh_target()
+            except Exception as e:
+                logging.error(f"Vérification de l'alias {self.alias_name()} impossible : {e}")
+
+    def watch(self):
+        """Démarre le suivi de l'alias (lifespan FastAPI) ; arrêté par `close`."""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def next_collection_name(self) -> str:
+        """Nom de la prochaine collection versionnée : `<COLLECTION_NAME>_v<n+1>`."""
+        pattern = re.compile(rf"^{re.escape(config.COLLECTION_NAME)}_v(\d+)$")
+        versions = [
+            int(match.group(1))
+            for collection in (await self.client.get_collections()).collections
+            if (match := pattern.match(collection.name))
+        ]
+        return f"{config.COLLECTION_NAME}_v{max(versions, default=0) + 1}"
+
+    async def create_collection(self, collection_name: str):
+        """Crée une collection vide avec la configuration actuelle (modèle, HNSW, quantification...)."""
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=self._vectors_config(get_size_for_embedding(config.EMBEDDING_MODEL)),
+            sparse_vectors_config=self._sparse_vectors_config(),
+            hnsw_config=self._hnsw_config(),
+            quantization_config=self._quantization_config(),
+        )
+        await self.ensure_payload_indexes(collection_name)
+        await self._register_collection(collection_name)
+
+    async def switch_alias(self, collection_name: str) -> Optional[str]:
+        """
+        Fait pointer l'alias `QDRANT.ALIAS` vers `collection_name`, en une seule opération.
+
+        Retourne la collection précédemment servie. La collection historique d'une
+        installation antérieure n'est pas touchée : elle se supprime ensuite comme
+        toute ancienne collection (`reindex --drop-previous`).
+        """
+        previous = await self.resolve_collection()
+        alias_name = self.alias_name()
+        operations = []
+        if await self._alias_target() is not None:
+            operations.append(
+                models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias_name))
+            )
+        operations.append(
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias_name)
+            )
+        )
+        await self.client.update_collection_aliases(change_aliases_operations=operations)
+        logging.info(f"Alias {alias_name} -> {collection_name}.")
+        return previous
+
+    async def ensure_collection(self):
+        """
+        Crée la collection si besoin, puis charge l'encodeur du schéma de la collection servie.
+
+        Appelée au démarrage de l'application, une fois le modèle chargé. Une collection
+        enregistrée est servie avec son propre schéma (modèle, dimension, mode hybride),
+        même si la configuration a changé depuis : la nouvelle s'applique à la ré-indexation.
+        """
+        collection_name = await self.resolve_collection()
+
+        if collection_name is None:
+            # Collection versionnée derrière l'alias : ré-indexable ensuite sans interruption
+            collection_name = await self.next_collection_name()
+            await self.create_collection(collection_name)
+            await self.switch_alias(collection_name)
+
+        await self.refresh_target()
+        hybrid = self.target.hybrid
+        size = self.target.encoder.dimension
+
+        vectors = (
+            await self.client.get_collection(collection_name=collection_name)
+        ).config.params.vectors
+        if isinstance(vectors, dict) != hybrid or (hybrid and DENSE_VECTOR not in vectors):
+            raise ValueError(
+                f"La collection {collection_name} ne correspond pas à QDRANT.HYBRID="
+                f"{hybrid} : ré-indexation nécessaire "
+                f"(python -m api.app.vector_db.commands reindex)"
+            )
+        existing_size = vectors[DENSE_VECTOR].size if hybrid else vectors.size
+        if existing_size != size:
+            raise ValueError(
+                f"La collection {collection_name} contient des vecteurs de dimension "
+                f"{existing_size}, le modèle {self.target.encoder.model_name} en produit {size} : "
+                f"ré-indexation nécessaire (python -m api.app.vector_db.commands reindex)"
+            )
+        await self.ensure_payload_indexes(collection_name)
 
     def __repr__(self):
         # Formater chaque ligne pour qu'elle soit bien alignée
-        collection_name_line = f"COLLECTION_NAME = {config.COLLECTION_NAME}"
-        host_line = f"CONNECTED TO QDRANT AT {config.QDRANT_URL}"
+        collection_name_line = f"COLLECTION_NAME = {self.collection_name or config.COLLECTION_NAME}"
+        host_line = (
+            f"CONNECTED TO QDRANT AT {config.QDRANT_URL}"
+            if self.backend == "server"
+            else f"EMBEDDED QDRANT AT {config.QDRANT.LOCAL_PATH or ':memory:'}"
+        )
         return f"""\n{collection_name_line}\n{host_line}\n"""
 
-    def search_best_chunks(self, query: str, k=config.NUMBER_BEST_CHUNKS):
+    async def apply_quantization(self):
+        """Applique la configuration de quantification actuelle à une collection existante."""
+        collection_name = await self.resolve_collection()
+        await self.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={
+                self._dense_vector_name(): models.VectorParamsDiff(on_disk=self._on_disk())
+            },
+            quantization_config=self._quantization_config() or models.Disabled.DISABLED,
+        )
+        logging.info(
+            f"Quantification '{config.QDRANT.QUANTIZATION}' appliquée à {collection_name}."
+        )
+
+    async def apply_index_settings(self):
+        """Applique les paramètres HNSW actuels et les index de payload à une collection existante."""
+        collection_name = await self.resolve_collection()
+        await self.client.update_collection(
+            collection_name=collection_name,
+            hnsw_config=self._hnsw_config(),
+        )
+        await self.ensure_payload_indexes(collection_name)
+        logging.info(
+            f"HNSW (m={config.QDRANT.HNSW_M}, ef_construct={config.QDRANT.HNSW_EF_CONSTRUCT}) "
+            f"appliqué à {collection_name}."
+        )
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, "search_latency_ms": self.search_latency.stats()}
+
+    def embed_query(self, query: str, encoder: Optional[EmbeddingModelManager] = None) -> List[float]:
         # Convert text query into vector
-        vector = EmbeddingForChunks.encode(query).tolist()
+        return (encoder or self.target.encoder).encode(query).tolist()
+
+    async def search_best_chunks(
+        self,
+        query: str,
+        k=config.NUMBER_BEST_CHUNKS,
+        vector: Optional[List[float]] = None,
+        hnsw_ef: Optional[int] = None,
+        file_uids: Optional[List[str]] = None,
+        metadata: Optional[Dict] = None,
+        target: Optional[VectorTarget] = None,
+    ):
+        # `vector` doit venir de `target.encoder` : l'appelant lit `self.target` une seule fois
+        target = target or self.target
+
+        # L'embedding peut être fourni s'il a déjà été calculé (cache sémantique)
+        if vector is None:
+            vector = await run_in_threadpool(self.embed_query, query, target.encoder)
+
+        # Recherche restreinte aux fichiers / métadonnées demandés (index de payload)
+        query_filter = self._query_filter(file_uids, metadata)
+
+        start = perf_counter()
+
+        if target.hybrid:
+            # Branches dense et creuse (termes exacts) fusionnées par rang réciproque (RRF) ;
+            # chaque branche fournit au moins `k` candidats (ex. `RERANK.CANDIDATES`)
+            prefetch_limit = max(config.QDRANT.HYBRID_PREFETCH, int(k))
+            search_result = (
+                await self.client.query_points(
+                    collection_name=target.collection_name,
+                    prefetch=[
+                        models.Prefetch(
+                            query=vector,
+                            using=DENSE_VECTOR,
+                            filter=query_filter,
+                            params=self._search_params(hnsw_ef),
+                            limit=prefetch_limit,
+                        ),
+                        models.Prefetch(
+                            query=sparse_encoder.encode_query(query),
+                            using=SPARSE_VECTOR,
+                            filter=query_filter,
+                            limit=prefetch_limit,
+                        ),
+                    ],
+                    query=models.FusionQuery(fusion=models.Fusion.RRF),
+                    query_filter=query_filter,
+                    limit=k,
+                )
+            ).points
+        else:
+            # Use `vector` for search for closest vectors in the collection
+            search_result = (
+                await self.client.query_points(
+                    collection_name=target.collection_name,
+                    query=vector,
+                    query_filter=query_filter,
+                    search_params=self._search_params(hnsw_ef),
+                    limit=k,
+                )
+            ).points
 
-        # Use `vector` for search for closest vectors in the collection
-        search_result = self.client.query_points(
-            collection_name=config.COLLECTION_NAME,
-            query=vector,
-            query_filter=None,
-            limit=k,
-        ).points
+        # Latence de la recherche seule : appel en processus (local) ou aller-retour serveur
+        self.search_latency.observe((perf_counter() - start) * 1000)
 
-        payloads = [hit.payload for hit in search_result]
+        # Le score sert à prioriser les chunks lors de l'assemblage du contexte,
+        # l'id à mettre en cache les scores du reclassement
+        payloads = [{**hit.payload, "id": str(hit.id), "score": hit.score} for hit in search_result]
         return payloads
 
-    def _create_vector(self, chunk: ChunkCreateModel):
-        """Charge et ajoute des fichiers au magasin de vecteurs"""
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+    @staticmethod
+    def _embed_chunks(
+        texts: List[str],
+        batch_size: int = config.EMBEDDING.BATCH_SIZE,
+        encoder: EmbeddingModelManager = EmbeddingForChunks,
+    ) -> np.ndarray:
+        """Embeddings des textes : lus dans le cache persistant, encodés seulement en cas d'absence"""
+        model_key = encoder.cache_key
+        hashes = [embedding_cache.hash(text) for text in texts]
+        cached = embedding_cache.get_many(model_key, hashes)
+
+        missing = [i for i, text_hash in enumerate(hashes) if text_hash not in cached]
+        if missing:
+            # `encode` trie les textes par longueur avant de former les lots (moins de padding)
+            encoded = encoder.encode_large(
+                [texts[i] for i in missing],
+                batch_size=batch_size,
+            ).astype(np.float32)
+            new_vectors = {hashes[i]: vector for i, vector in zip(missing, encoded)}
+            embedding_cache.put_many(model_key, new_vectors)
+            cached.update(new_vectors)
+
+        logging.info(f"Embeddings : {len(texts) - len(missing)} en cache, {len(missing)} encodés.")
+        return np.stack([cached[text_hash] for text_hash in hashes])
+
+    @staticmethod
+    def _point(
+        chunk: ChunkCreateModel, vector: np.ndarray, hybrid: bool = config.QDRANT.HYBRID
+    ) -> PointStruct:
+        """Point Qdrant d'un chunk ; en mode hybride, avec son vecteur creux BM25."""
+        if hybrid:
+            point_vector = {
+                DENSE_VECTOR: vector.tolist(),
+                SPARSE_VECTOR: sparse_encoder.encode_document(chunk.content),
+            }
+        else:
+            point_vector = vector.tolist()
+
+        return PointStruct(
+            id=str(uuid4()),
+            payload={
+                "content": chunk.content,
+                "metadata": chunk.metadata,
+            },
+            vector=point_vector,
+        )
 
-        uuid = str(uuid4())
+    async def _create_vector(self, chunk: ChunkCreateModel):
+        """Charge et ajoute des fichiers au magasin de vecteurs"""
+        target = self.target
+        target.encoder.empty_cache()
 
-        vector = EmbeddingForChunks.encode(chunk.content)
+        vector = (
+            await run_in_threadpool(self._embed_chunks, [chunk.content], encoder=target.encoder)
+        )[0]
 
-        self.client.upsert(
-            collection_name=config.COLLECTION_NAME,
-            points=[
-                PointStruct(
-                    id=uuid,
-                    payload={
-                        "content": chunk.content,
-                        "metadata": chunk.metadata,
-                    },
-                    vector=vector,
-                ),
-            ],
+        await self.client.upsert(
+            collection_name=target.collection_name,
+            points=[self._point(chunk, vector, target.hybrid)],
         )
 
         return None
 
-    def create_vectors(self, chunks: List[ChunkCreateModel]):
-        for chunk in chunks:
-            self._create_vector(chunk=chunk)
+    async def create_vectors(
+        self,
+        chunks: List[ChunkCreateModel],
+        batch_size: int = config.EMBEDDING.BATCH_SIZE,
+        upsert_batch_size: int = config.EMBEDDING.UPSERT_BATCH_SIZE,
+        wait: bool = config.EMBEDDING.UPSERT_WAIT,
+        target: Optional[VectorTarget] = None,
+    ):
+        """Encode tous les chunks par lots puis les envoie à Qdrant en quelques upserts groupés"""
+        if not chunks:
+            return None
+        # Vecteurs du schéma de la collection alimentée (servie par défaut)
+        target = target or self.target
+
+        start_time = perf_counter()
+        target.encoder.empty_cache()
+
+        # L'encodage (CPU/GPU) tourne hors de la boucle d'évènements
+        vectors = await run_in_threadpool(
+            self._embed_chunks,
+            [chunk.content for chunk in chunks],
+            batch_size=batch_size,
+            encoder=target.encoder,
+        )
+
+        # Vecteurs creux (mode hybride) calculés eux aussi hors de la boucle d'évènements
+        points = await run_in_threadpool(
+            lambda: [
+                self._point(chunk, vector, target.hybrid) for chunk, vector in zip(chunks, vectors)
+            ]
+        )
+
+        for i in range(0, len(points), upsert_batch_size):
+            await self.client.upsert(
+                collection_name=target.collection_name,
+                points=points[i : i + upsert_batch_size],
+                wait=wait,
+            )
 
-            logging.info(f"{len(chunks)} chunks ajoutés au magasin de vecteurs.")
-            print(f"{len(chunks)} chunks ajoutés au magasin de vecteurs.")
+        duration = perf_counter() - start_time
+        logging.info(
+            f"{len(chunks)} chunks ajoutés au magasin de vecteurs "
+            f"en {duration:.2f}s ({len(chunks) / duration:.1f} chunks/s)."
+        )
+        return None
 
-    def delete_vectors(self, key, value):
+    async def delete_vectors(self, key, value, collection_name: Optional[str] = None):
 
-        self.client.delete(
-            collection_name=config.COLLECTION_NAME,
+        await self.client.delete(
+            collection_name=collection_name or self.collection_name,
             points_selector=models.FilterSelector(
                 filter=models.Filter(
                     must=[
@@ -365,26 +896,26 @@ class VectorDatabaseService:
         )
         pass
 
-    def _rollback(self, operation: str):
+    async def _rollback(self, operation: str):
         if operation == "post":
-            self._delete_vectors()
+            await self._delete_vectors()
 
             return
 
         elif operation == "delete":
             if self.backup_chunk_data is not None and len(self.backup_chunk_data) > 0:
-                self.client.upsert(
-                    collection_name=config.COLLECTION_NAME,
+                await self.client.upsert(
+                    collection_name=self.collection_name,
                     points=self.backup_chunk_data,
                 )
 
             return
 
-    def commit(self, operation: str):
+    async def commit(self, operation: str):
         if operation == "post":
             try:
-                self.client.upsert(
-                    collection_name=config.COLLECTION_NAME,
+                await self.client.upsert(
+                    collection_name=self.collection_name,
                     points=self.vectors,
                 )
 
@@ -395,17 +926,17 @@ class VectorDatabaseService:
 
             except Exception as e:
                 print(f"Erreur : {e}")
-                self._rollback(operation="post")
+                await self._rollback(operation="post")
 
                 raise
 
         elif operation == "delete":
             try:
-                self._get_vectors()
-                self._delete_vectors()
+                await self._get_vectors()
+                await self._delete_vectors()
 
             except Exception as e:
                 print(f"Erreur : {e}")
-                self._rollback(operation="delete")
+                await self._rollback(operation="delete")
 
                 raise
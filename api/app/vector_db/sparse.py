@@ -0,0 +1,72 @@
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client import models
+
+from api.app.config import config
+
+# Mots vides les plus fréquents du corpus (français / anglais) : sans intérêt pour la recherche exacte
+STOPWORDS = {
+    "a", "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "elle", "en", "est",
+    "et", "il", "la", "le", "les", "leur", "lui", "mais", "ne", "ou", "par", "pas", "pour",
+    "qu", "que", "qui", "sa", "se", "ses", "son", "sur", "un", "une", "d", "l", "n", "s",
+    "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "the", "to", "with",
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class Bm25SparseEncoder:
+    """
+    Vecteurs creux façon BM25, calculés localement sans modèle.
+
+    Chaque token (minuscules, sans accents) est haché en un indice stable ; sa valeur est
+    la composante TF saturée de BM25. L'IDF est appliqué par Qdrant (`Modifier.IDF`) sur
+    le vecteur creux de la collection, il n'est donc pas stocké ici.
+    """
+
+    def __init__(
+        self,
+        k1: float = config.QDRANT.BM25_K1,
+        b: float = config.QDRANT.BM25_B,
+        avg_length: float = config.QDRANT.BM25_AVG_LENGTH,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.avg_length = avg_length
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        return [token for token in _TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+    @staticmethod
+    def index(token: str) -> int:
+        return zlib.crc32(token.encode("utf-8"))
+
+    def _sparse_vector(self, weights: Counter) -> models.SparseVector:
+        # Deux tokens peuvent partager un indice (collision de hachage) : on cumule
+        merged = Counter()
+        for token, weight in weights.items():
+            merged[self.index(token)] += weight
+        return models.SparseVector(indices=list(merged.keys()), values=list(merged.values()))
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        tokens = self.tokenize(text)
+        length_norm = 1 - self.b + self.b * len(tokens) / self.avg_length
+        weights = Counter()
+        for token, tf in Counter(tokens).items():
+            weights[token] = tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return self._sparse_vector(weights)
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        # Chaque terme de la question compte une fois ; le poids vient de l'IDF côté Qdrant
+        return self._sparse_vector(Counter(dict.fromkeys(self.tokenize(text), 1.0)))
+
+
+sparse_encoder = Bm25SparseEncoder()
@@ -0,0 +1,198 @@
+"""
+Benchmark des modèles d'embedding sur un corpus local.
+
+Le corpus est un dossier de fichiers Markdown (sortie Docling) et le jeu de questions
+un fichier JSON : [{"question": "...", "files": ["notice.md", ...]}, ...] où `files`
+liste les fichiers contenant la réponse.
+
+Pour chaque couple (modèle, backend), dans un processus dédié (mémoire crête isolée) :
+    - débit d'encodage (chunks/s) pour plusieurs tailles de lot ;
+    - mémoire crête (RSS du processus, et VRAM si GPU) ;
+    - temps de construction de l'index dans un Qdrant embarqué ;
+    - latence des requêtes (encodage + recherche) et recall@k.
+
+Chaque exécution ajoute une ligne JSON par couple au fichier de sortie.
+
+Usage :
+    python -m api.benchmarks.embeddings --corpus dossier_md/ --questions questions.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from api.app.config import EMBEDDING_MODEL
+
+
+def load_chunks(corpus: Path) -> List:
+    from api.app.vector_db.schemas import FileForChunkModel
+    from api.app.vector_db.service import ChunkService
+
+    chunk_service = ChunkService()
+    chunks = []
+    for path in sorted(corpus.glob("*.md")):
+        chunk_service.create_chunks_from_text(
+            file_for_chunk_data=FileForChunkModel(
+                str_file_content=path.read_text(encoding="utf-8"),
+                dict_file_metadata={"filename": path.name},
+            )
+        )
+        chunks.extend(chunk_service.chunks)
+    return chunks
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run_benchmark(
+    model_name: str,
+    backend: str,
+    corpus: Path,
+    questions: List[Dict],
+    batch_sizes: List[int],
+    ks: List[int],
+    devices: List[str],
+    qdrant_location: str,
+    output_dim: Optional[int] = None,
+) -> Dict:
+    import torch
+    from qdrant_client import QdrantClient, models
+
+    from api.app.vector_db.embedding import EmbeddingModelManager
+
+    chunks = load_chunks(corpus)
+    texts = [chunk.content for chunk in chunks]
+
+    # Dimension explicite : `EMBEDDING.OUTPUT_DIM` ne doit pas tronquer tous les modèles comparés
+    manager = EmbeddingModelManager(
+        model_name=model_name, devices=devices, backend=backend, output_dim=output_dim
+    )
+    start = perf_counter()
+    manager.warmup()
+    load_time = perf_counter() - start
+
+    # Débit d'encodage
+    throughput = {}
+    for batch_size in batch_sizes:
+        start = perf_counter()
+        manager.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        throughput[str(batch_size)] = len(texts) / (perf_counter() - start)
+
+    # Construction de l'index dans un Qdrant embarqué
+    client = QdrantClient(location=qdrant_location) if qdrant_location == ":memory:" else QdrantClient(path=qdrant_location)
+    collection_name = f"benchmark_{model_name.replace('/', '_')}_{backend}"
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+
+    start = perf_counter()
+    vectors = manager.encode(texts, batch_size=max(batch_sizes), convert_to_numpy=True)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(size=manager.dimension, distance=models.Distance.COSINE),
+    )
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(id=i, vector=vector.tolist(), payload={"filename": chunk.metadata["filename"]})
+            for i, (chunk, vector) in enumerate(zip(chunks, vectors))
+        ],
+    )
+    index_build_time = perf_counter() - start
+
+    # Latence des requêtes et recall@k
+    latencies = []
+    recall = {str(k): 0.0 for k in ks}
+    for item in questions:
+        start = perf_counter()
+        query = manager.encode(item["question"]).tolist()
+        hits = client.query_points(collection_name=collection_name, query=query, limit=max(ks)).points
+        latencies.append((perf_counter() - start) * 1000)
+
+        expected = set(item["files"])
+        for k in ks:
+            found = {hit.payload["filename"] for hit in hits[:k]}
+            recall[str(k)] += len(found & expected) / len(expected)
+
+    client.close()
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "host": platform.node(),
+        "model": model_name,
+        "backend": manager.backend,  # Backend effectif (repli ONNX -> torch possible)
+        "device": manager.device,
+        "dimension": manager.dimension,
+        "output_dim": output_dim,
+        "chunks": len(texts),
+        "questions": len(questions),
+        "load_time_s": load_time,
+        "encode_throughput": throughput,
+        "index_build_time_s": index_build_time,
+        "query_latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        },
+        "recall_at_k": {k: value / len(questions) if questions else 0.0 for k, value in recall.items()},
+        # ru_maxrss est en Ko sous Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_vram_mb": (
+            torch.cuda.max_memory_allocated() / (1024 * 1024) if torch.cuda.is_available() else 0.0
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des modèles d'embedding")
+    parser.add_argument("--corpus", type=Path, required=True, help="Dossier de fichiers Markdown")
+    parser.add_argument("--questions", type=Path, required=True, help="Questions annotées (JSON)")
+    parser.add_argument("--models", nargs="+", default=[str(model) for model in EMBEDDING_MODEL])
+    parser.add_argument("--backends", nargs="+", default=["torch"], choices=["torch", "onnx"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32, 64])
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 5, 10])
+    parser.add_argument("--devices", nargs="+", default=["cpu"])
+    parser.add_argument("--qdrant", default=":memory:", help="':memory:' ou dossier d'un Qdrant local")
+    parser.add_argument(
+        "--output-dim", type=int, default=None, help="Troncature Matryoshka (modèles compatibles uniquement)"
+    )
+    parser.add_argument("--output", type=Path, default=Path("embedding_benchmark.jsonl"))
+    args = parser.parse_args()
+
+    questions = json.loads(args.questions.read_text(encoding="utf-8"))
+
+    for model_name in args.models:
+        for backend in args.backends:
+            print(f"Benchmark {model_name} ({backend})...")
+            # Un processus par couple : la mémoire crête mesurée ne concerne que ce modèle
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result = executor.submit(
+                    run_benchmark,
+                    model_name,
+                    backend,
+                    args.corpus,
+                    questions,
+                    args.batch_sizes,
+                    args.k,
+                    args.devices,
+                    args.qdrant,
+                    args.output_dim,
+                ).result()
+
+            with args.output.open("a", encoding="utf-8") as output:
+                output.write(json.dumps(result) + "\n")
+            print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
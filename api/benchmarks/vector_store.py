@@ -0,0 +1,135 @@
+"""
+Latence de recherche : Qdrant embarqué (en processus) contre serveur Qdrant.
+
+Copie jusqu'à `--points` points de la collection servie par le serveur (`QDRANT_URL`, cible de
+l'alias `QDRANT.ALIAS` ou collection historique `COLLECTION_NAME`) dans un Qdrant embarqué, puis envoie les mêmes requêtes aux deux backends. Les requêtes
+sont des vecteurs de la collection elle-même : aucun modèle d'embedding n'est chargé.
+
+Chaque exécution ajoute une ligne JSON au fichier de sortie.
+
+Usage :
+    python -m api.benchmarks.vector_store --points 10000 --queries 200
+"""
+
+import argparse
+import json
+import platform
+import random
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+from api.app.config import config
+from api.benchmarks.embeddings import percentile
+
+
+def copy_collection(server, local, collection_name: str, limit: int) -> List:
+    """Copie les points (vecteurs + payload) du serveur vers le Qdrant embarqué."""
+    from qdrant_client import models
+
+    params = server.get_collection(collection_name).config.params
+    local.create_collection(
+        collection_name=collection_name,
+        vectors_config=params.vectors,
+        sparse_vectors_config=params.sparse_vectors,
+    )
+
+    points = []
+    offset = None
+    while len(points) < limit:
+        batch, offset = server.scroll(
+            collection_name=collection_name,
+            limit=min(1000, limit - len(points)),
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        local.upsert(
+            collection_name=collection_name,
+            points=[
+                models.PointStruct(id=point.id, vector=point.vector, payload=point.payload)
+                for point in batch
+            ],
+        )
+        points.extend(batch)
+        if offset is None:
+            break
+    return points
+
+
+def measure(client, collection_name: str, queries: List, using, k: int) -> Dict:
+    latencies = []
+    for query in queries:
+        start = perf_counter()
+        client.query_points(collection_name=collection_name, query=query, using=using, limit=k)
+        latencies.append((perf_counter() - start) * 1000)
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+    }
+
+
+def main():
+    from qdrant_client import QdrantClient
+
+    from api.app.vector_db.service import DENSE_VECTOR, VectorDatabaseService
+
+    parser = argparse.ArgumentParser(description="Latence de recherche : Qdrant embarqué / serveur")
+    parser.add_argument("--points", type=int, default=10000, help="Points copiés dans le Qdrant embarqué")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=int(config.NUMBER_BEST_CHUNKS))
+    parser.add_argument("--local", default=":memory:", help="':memory:' ou dossier du Qdrant embarqué")
+    parser.add_argument("--output", type=Path, default=Path("vector_store_benchmark.jsonl"))
+    args = parser.parse_args()
+
+    server = QdrantClient(url=config.QDRANT_URL, prefer_grpc=config.QDRANT.PREFER_GRPC)
+    collection_name = next(
+        (
+            alias.collection_name
+            for alias in server.get_aliases().aliases
+            if alias.alias_name == VectorDatabaseService.alias_name()
+        ),
+        config.COLLECTION_NAME,
+    )
+    local = QdrantClient(location=args.local) if args.local == ":memory:" else QdrantClient(path=args.local)
+    if local.collection_exists(collection_name):
+        local.delete_collection(collection_name)
+
+    start = perf_counter()
+    points = copy_collection(server, local, collection_name, args.points)
+    copy_time = perf_counter() - start
+
+    # Collection hybride : on interroge le vecteur dense nommé
+    named = isinstance(points[0].vector, dict) if points else False
+    using = DENSE_VECTOR if named else None
+    sample = random.sample(points, min(args.queries, len(points)))
+    queries = [point.vector[DENSE_VECTOR] if named else point.vector for point in sample]
+
+    # Une requête de chauffe par backend (connexion, chargement des segments)
+    for client in (server, local):
+        measure(client, collection_name, queries[:1], using, args.k)
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "host": platform.node(),
+        "collection": collection_name,
+        "points": len(points),
+        "queries": len(queries),
+        "k": args.k,
+        "grpc": config.QDRANT.PREFER_GRPC,
+        "local_copy_time_s": copy_time,
+        "server_latency_ms": measure(server, collection_name, queries, using, args.k),
+        "local_latency_ms": measure(local, collection_name, queries, using, args.k),
+    }
+    server.close()
+    local.close()
+
+    with args.output.open("a", encoding="utf-8") as output:
+        output.write(json.dumps(result) + "\n")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
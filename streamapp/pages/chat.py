@@ -21,13 +21,15 @@ class ChatBot:
 
         if "pdf_selectionnee" not in st.session_state:
             st.session_state.pdf_selectionnee = None
+            st.session_state.pdf_selectionnee_uid = None
 
 
 
         self.response = None
 
-    def _select_pdf_path(self, filename):
+    def _select_pdf_path(self, filename, file_uid=None):
         st.session_state.pdf_selectionnee = filename
+        st.session_state.pdf_selectionnee_uid = file_uid
 
     def _retrieve_filepaths(self, chunk):
         try:
@@ -48,9 +50,9 @@ class ChatBot:
     def _get_chunks_set(self, chunks):
         list_of_filename = []
         for chunk in chunks:
-            list_of_filename.append(chunk["filename"])
+            list_of_filename.append((chunk["filename"], chunk.get("file_uid")))
 
-        return set(list_of_filename)
+        return dict.fromkeys(list_of_filename)
 
 
     def _display_messages(self):
@@ -58,7 +60,7 @@ class ChatBot:
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
                 if "chunks" in message:
-                    for i, filename in enumerate(self._get_chunks_set(message["chunks"])):
+                    for i, (filename, file_uid) in enumerate(self._get_chunks_set(message["chunks"])):
                         # Utilisation de la constante s'incrémentant et de la clé unique
                         unique_key = f"{filename}_{i}_{st.session_state.question_counter}"
 
@@ -66,7 +68,7 @@ class ChatBot:
                             f"``Source{i+1}``: {filename}",
                             key=unique_key,  # Clé unique combinée avec le compteur
                             on_click=self._select_pdf_path,
-                            args=(filename,),
+                            args=(filename, file_uid),
                         )
 
                         st.session_state.question_counter += 1
@@ -90,8 +92,11 @@ class ChatBot:
             # Ajouter la question de l'utilisateur à l'historique
             st.session_state.messages.append({"role": "user", "content": prompt})
 
-            # Obtenir la réponse via le modèle
-            self.response = ask_question(prompt)
+            # Obtenir la réponse via le modèle, éventuellement limitée au PDF affiché
+            file_uids = None
+            if st.session_state.get("recherche_pdf_selectionne") and st.session_state.pdf_selectionnee_uid:
+                file_uids = [st.session_state.pdf_selectionnee_uid]
+            self.response = ask_question(prompt, file_uids=file_uids)
 
             if self.response["content"] != "Je ne sais pas":
                 # Ajouter la réponse complète à l'historique
@@ -109,10 +114,11 @@ class ChatBot:
                             "index": index,
                             "content": str(chunk["content"]),
                             "filename": filename,
+                            "file_uid": chunk["metadata"]["filename"],
                         }
                     )
                     if index ==0:
-                        self._select_pdf_path(filename)
+                        self._select_pdf_path(filename, chunk["metadata"]["filename"])
 
                 # Ajouter les chunks à l'historique
                 st.session_state.messages.append(
@@ -142,6 +148,11 @@ class ChatBot:
         with col1:
             with col1.container(border=True, height=520):
                 st.subheader("CHATBOT")
+                st.toggle(
+                    "Rechercher uniquement dans le PDF affiché",
+                    key="recherche_pdf_selectionne",
+                    disabled=not st.session_state.pdf_selectionnee_uid,
+                )
                 self._display_messages()  # Afficher l'historique des messages
                 self._handle_user_input()  # Gérer l'entrée de l'utilisateur
 